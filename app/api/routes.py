@@ -1,49 +1,202 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, jsonify, request, send_from_directory, stream_with_context, url_for
+import hmac
+import json
 import logging
+import os
+from typing import Dict
+
+from app.batch.jobs import ALL_ROUNDS_JOB_KEY, CURRENT_ROUND_JOB_KEY, PROFILE_JOB_SUFFIX
 
 api_bp = Blueprint('api', __name__)
 logger = logging.getLogger(__name__)
 
+LATEST_PREDICTION_MAX_AGE = 60
+DEFAULT_TICKET_COMBINATIONS = 16
+MAX_TICKET_COMBINATIONS = 3 ** 13
+EVENT_STREAM_RETRY_MS = 3000
+
 @api_bp.route('/run-batch', methods=['POST'])
 def run_batch():
     try:
-        from app.batch.scraper import TotoScraper
-        from app.batch.predictor import TotoPredictor
-        
-        logger.info("バッチ処理を開始します")
-        
-        scraper = TotoScraper()
-        predictor = TotoPredictor()
-        
-        toto_info = scraper.get_latest_toto_info()
-        if not toto_info:
-            return jsonify({'error': 'toto情報の取得に失敗しました'}), 500
-            
-        team_data = scraper.get_team_performance_data(toto_info['matches'])
-        if not team_data:
-            return jsonify({'error': 'チーム成績データの取得に失敗しました'}), 500
-            
-        predictions = predictor.predict_matches(toto_info, team_data)
-        
-        logger.info("バッチ処理が完了しました")
+        profile = request.headers.get('X-Toto-Profile') == '1'
+        if profile and not _admin_authorized():
+            return jsonify({'error': 'プロファイル実行には管理用トークンが必要です'}), 403
         
-        return jsonify({
-            'status': 'success',
-            'toto_info': toto_info,
-            'predictions': predictions
-        }), 200
+        return _submit_batch(request.args.get('scope') == 'all', profile)
         
     except Exception as e:
-        logger.error(f"バッチ処理でエラーが発生しました: {str(e)}")
-        return jsonify({'error': f'バッチ処理でエラーが発生しました: {str(e)}'}), 500
+        logger.error(f"バッチ処理の登録でエラーが発生しました: {str(e)}")
+        return jsonify({'error': f'バッチ処理の登録でエラーが発生しました: {str(e)}'}), 500
+
+def _submit_batch(all_rounds: bool, profile: bool = False):
+    from app.batch.jobs import get_job_manager
+    from app.batch import pipeline
+    from app.batch.ratelimit import get_rate_limiter, retry_after_header
+    
+    key = ALL_ROUNDS_JOB_KEY if all_rounds else CURRENT_ROUND_JOB_KEY
+    if profile:
+        key, func = key + PROFILE_JOB_SUFFIX, lambda: pipeline.run_profiled_batch_pipeline(all_rounds=all_rounds)
+    elif all_rounds:
+        func = lambda: pipeline.run_batch_pipeline(all_rounds=True)
+    else:
+        func = pipeline.run_batch_pipeline
+    
+    # 実行中のジョブへの合流は上流へのリクエストを増やさないため、レート制限の対象外とする
+    manager = get_job_manager()
+    job, joined = manager.join(key), True
+    if job is None:
+        if not profile:
+            allowed, retry_after = get_rate_limiter().acquire(request.remote_addr or 'unknown')
+            if not allowed:
+                response = jsonify({'error': 'リクエストが多すぎます。しばらく待ってから再実行してください'})
+                response.headers['Retry-After'] = retry_after_header(retry_after)
+                return response, 429
+        job, joined = manager.submit_or_join(key, func)
+    
+    return jsonify({
+        'status': 'accepted',
+        'job_id': job.id,
+        'joined': joined,
+        'profile': profile,
+        'job_url': url_for('api.get_job', job_id=job.id),
+        'events_url': url_for('api.stream_job_events', job_id=job.id)
+    }), 202
+
+def _admin_authorized() -> bool:
+    token = os.environ.get('TOTO_ADMIN_TOKEN')
+    supplied = request.headers.get('X-Toto-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+@api_bp.route('/admin/profile', methods=['POST'])
+def run_profiled_batch():
+    if not _admin_authorized():
+        return jsonify({'error': '管理用トークンが正しくありません'}), 403
+    
+    return _submit_batch(request.args.get('scope') == 'all', profile=True)
+
+@api_bp.route('/admin/profiles', methods=['GET'])
+def list_profile_artifacts():
+    from app.batch.profiling import list_profiles
+    
+    if not _admin_authorized():
+        return jsonify({'error': '管理用トークンが正しくありません'}), 403
+    
+    return jsonify({'profiles': list_profiles()}), 200
+
+@api_bp.route('/admin/profiles/<name>', methods=['GET'])
+def get_profile_artifact(name):
+    from app.batch.profiling import list_profiles, profile_dir
+    
+    if not _admin_authorized():
+        return jsonify({'error': '管理用トークンが正しくありません'}), 403
+    if name not in list_profiles():
+        return jsonify({'error': 'プロファイルが見つかりません'}), 404
+    
+    mimetype = 'application/json' if name.endswith('.json') else 'text/plain'
+    return send_from_directory(profile_dir(), name, mimetype=mimetype)
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    from app.batch.jobs import get_job_manager
+    
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'ジョブが見つかりません'}), 404
+    
+    return jsonify(job.to_dict()), 200
+
+@api_bp.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    from app.batch.jobs import get_job_manager
+    from app.batch.models import dumps
+    
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'ジョブが見つかりません'}), 404
+    
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+    
+    def generate():
+        yield f'retry: {EVENT_STREAM_RETRY_MS}\n\n'
+        for item in job.iter_events(after):
+            if item is None:
+                yield ': keep-alive\n\n'
+                continue
+            event_id, event, data = item
+            yield f'id: {event_id}\nevent: {event}\ndata: {dumps(data)}\n\n'
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @api_bp.route('/latest-prediction', methods=['GET'])
 def get_latest_prediction():
     try:
-        return jsonify({
-            'message': '最新の予想データを取得する機能は未実装です',
-            'status': 'not_implemented'
-        }), 501
+        from app.batch.store import get_prediction_store
+        
+        latest = get_prediction_store().latest()
+        if latest is None:
+            return jsonify({
+                'message': '予想データがまだありません',
+                'status': 'not_found'
+            }), 404
+        
+        return _prediction_response(latest)
+        
     except Exception as e:
         logger.error(f"予想データ取得でエラーが発生しました: {str(e)}")
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/predictions/<round_number>', methods=['GET'])
+def get_round_prediction(round_number):
+    from app.batch.store import get_prediction_store
+    
+    entry = get_prediction_store().get_round(round_number)
+    if entry is None:
+        return jsonify({
+            'message': f'第{round_number}回の予想データがありません',
+            'status': 'not_found'
+        }), 404
+    
+    return _prediction_response(entry)
+
+def _prediction_response(entry: Dict) -> Response:
+    from app.batch.encoding import IDENTITY, negotiate
+    from app.batch.metrics import PREDICTION_RESPONSES
+    
+    encoding = negotiate(request.headers.get('Accept-Encoding'), entry['variants'])
+    response = Response(entry['variants'][encoding], mimetype='application/json')
+    if encoding != IDENTITY:
+        response.headers['Content-Encoding'] = encoding
+    # 表現ごとに異なるETagを付け、中間キャッシュが圧縮済みの本文を取り違えないようにする
+    response.set_etag(entry['etag'] if encoding == IDENTITY else f"{entry['etag']}-{encoding}")
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = LATEST_PREDICTION_MAX_AGE
+    PREDICTION_RESPONSES.inc(encoding=encoding)
+    return response.make_conditional(request)
+
+@api_bp.route('/tickets', methods=['GET'])
+def get_ticket():
+    from app.batch.store import get_prediction_store
+    from app.batch.tickets import optimize_ticket
+    
+    raw_combinations = request.args.get('max_combinations', str(DEFAULT_TICKET_COMBINATIONS))
+    max_combinations = int(raw_combinations) if raw_combinations.isdigit() else 0
+    if not 1 <= max_combinations <= MAX_TICKET_COMBINATIONS:
+        return jsonify({'error': f'max_combinations は1〜{MAX_TICKET_COMBINATIONS}の整数で指定してください'}), 400
+    
+    round_number = request.args.get('round')
+    store = get_prediction_store()
+    entry = store.get_round(round_number) if round_number else store.latest()
+    probabilities = json.loads(entry['payload']).get('probabilities') if entry else None
+    if not probabilities:
+        return jsonify({
+            'message': '確率付きの予想データがまだありません',
+            'status': 'not_found'
+        }), 404
+    
+    ticket = optimize_ticket(probabilities, max_combinations)
+    return jsonify({'round': entry['round'], 'max_combinations': max_combinations, **ticket}), 200
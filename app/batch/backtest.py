@@ -0,0 +1,163 @@
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.batch.history import DEFAULT_HISTORY_PATH, HistoryStore
+from app.batch.predictor import TotoPredictor
+from app.batch.vectorized import PADDING, PARAM_NAMES, TeamTable, VectorizedPredictor, make_param_grid
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_CODES = {'1': 1, '0': 0, '2': 2}
+
+_worker_state: Dict = {}
+
+def _init_worker(features: np.ndarray, has_stats: np.ndarray, home_idx: np.ndarray,
+                 away_idx: np.ndarray, actual: np.ndarray) -> None:
+    _worker_state['table'] = TeamTable(features, has_stats)
+    _worker_state['home_idx'] = home_idx
+    _worker_state['away_idx'] = away_idx
+    _worker_state['actual'] = actual
+    _worker_state['engine'] = VectorizedPredictor()
+
+def _evaluate_chunk(params: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    state = _worker_state
+    codes = state['engine'].predict_codes(state['table'], state['home_idx'], state['away_idx'], params)
+    return _score_codes(codes, state['actual'])
+
+def _score_codes(codes: np.ndarray, actual: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    known = actual != PADDING
+    hits = ((codes == actual) & known).sum(axis=-1)
+    known_per_round = known.sum(axis=-1)
+    full_hits = ((hits == known_per_round) & (known_per_round > 0)).sum(axis=-1)
+    return hits.sum(axis=-1), full_hits
+
+class BacktestRunner:
+    def __init__(self, rounds: List[Tuple[Dict, Dict, Dict[int, str]]]):
+        self.rounds = rounds
+        self.engine = VectorizedPredictor()
+        self._packed = None
+        self.total = sum(
+            1 for toto_info, _, results in rounds
+            for match in toto_info['matches'] if results.get(match['match_number']) in OUTCOME_CODES
+        )
+
+    @classmethod
+    def from_store(cls, store: HistoryStore) -> 'BacktestRunner':
+        return cls(store.load_rounds())
+
+    def replay(self, params: Optional[Dict[str, float]] = None) -> Dict:
+        # 拮抗した試合はsweepのベクトル化版と同じく常に引き分けとし、同じパラメータなら同じ的中数になるようにする
+        predictor = TotoPredictor(close_match_prediction='0', **(params or {}))
+        correct = 0
+        full_hit_rounds = 0
+
+        for toto_info, team_data, results in self.rounds:
+            predictions = predictor.predict_matches(toto_info, team_data)
+            known = [p for p in predictions if results.get(p['match_number']) in OUTCOME_CODES]
+            hits = sum(1 for p in known if p['prediction'] == results[p['match_number']])
+            correct += hits
+            if known and hits == len(known):
+                full_hit_rounds += 1
+
+        full_params = {name: getattr(predictor, name) for name in PARAM_NAMES}
+        return self._summarize(full_params, correct, full_hit_rounds)
+
+    def _pack(self) -> Tuple[TeamTable, np.ndarray, np.ndarray, np.ndarray]:
+        if self._packed is None:
+            table, home_idx, away_idx = self.engine.pack_rounds([(t, d) for t, d, _ in self.rounds])
+            actual = np.full(home_idx.shape, PADDING, dtype=np.int8)
+            for r, (toto_info, _, results) in enumerate(self.rounds):
+                for m, match in enumerate(toto_info['matches']):
+                    outcome = results.get(match['match_number'])
+                    if outcome in OUTCOME_CODES:
+                        actual[r, m] = OUTCOME_CODES[outcome]
+            self._packed = (table, home_idx, away_idx, actual)
+        return self._packed
+
+    def sweep(self, grid: Dict[str, np.ndarray], processes: Optional[int] = None,
+              chunk_size: int = 256) -> List[Dict]:
+        table, home_idx, away_idx, actual = self._pack()
+        params = self.engine._normalize_params(grid)
+        param_count = len(params['home_advantage'])
+        chunks = [
+            {name: values[start:start + chunk_size] for name, values in params.items()}
+            for start in range(0, param_count, chunk_size)
+        ]
+        processes = processes or os.cpu_count() or 1
+
+        start_time = time.monotonic()
+        if processes == 1 or len(chunks) == 1:
+            _init_worker(table.features, table.has_stats, home_idx, away_idx, actual)
+            results = [_evaluate_chunk(chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(processes, len(chunks)),
+                initializer=_init_worker,
+                initargs=(table.features, table.has_stats, home_idx, away_idx, actual)
+            ) as executor:
+                results = list(executor.map(_evaluate_chunk, chunks))
+
+        correct = np.concatenate([c for c, _ in results]) if results else np.empty(0)
+        full_hits = np.concatenate([f for _, f in results]) if results else np.empty(0)
+        logger.info(f"パラメータ探索完了: {param_count}通り × {len(self.rounds)}回 ({time.monotonic() - start_time:.2f}秒)")
+
+        reports = [
+            self._summarize({name: float(params[name][i]) for name in PARAM_NAMES}, int(correct[i]), int(full_hits[i]))
+            for i in range(param_count)
+        ]
+        reports.sort(key=lambda x: (x['accuracy'], x['full_hit_rounds']), reverse=True)
+        return reports
+
+    def _summarize(self, params: Dict[str, float], correct: int, full_hit_rounds: int) -> Dict:
+        total = self.total
+        return {
+            'params': params,
+            'rounds': len(self.rounds),
+            'correct': correct,
+            'total': total,
+            'accuracy': correct / total if total else 0.0,
+            'mean_hits_per_round': correct / len(self.rounds) if self.rounds else 0.0,
+            'full_hit_rounds': full_hit_rounds
+        }
+
+def format_report(reports: List[Dict], top: int = 10) -> str:
+    lines = ['順位  的中率   平均的中  全的中  ' + '  '.join(PARAM_NAMES)]
+    for i, report in enumerate(reports[:top]):
+        params = '  '.join(f"{report['params'][name]:.2f}" for name in PARAM_NAMES)
+        lines.append(
+            f"{i + 1:>4}  {report['accuracy']:6.1%}  {report['mean_hits_per_round']:8.2f}"
+            f"  {report['full_hit_rounds']:6d}  {params}"
+        )
+    return '\n'.join(lines)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='過去の回で予想パラメータをバックテストします')
+    parser.add_argument('--db', default=os.environ.get('TOTO_HISTORY_DB', DEFAULT_HISTORY_PATH))
+    parser.add_argument('--steps', type=int, default=11, help='各重みの分割数')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    runner = BacktestRunner.from_store(HistoryStore(args.db))
+    if not runner.rounds:
+        print('結果付きの過去データがありません')
+        return
+
+    weights = np.linspace(0, 1, args.steps)
+    grid = make_param_grid(
+        recent_matches_weight=weights,
+        ranking_weight=weights,
+        home_away_weight=weights,
+        home_advantage=np.arange(0, 11, 2.5)
+    )
+    print(format_report(runner.sweep(grid, processes=args.processes), top=args.top))
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
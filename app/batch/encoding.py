@@ -0,0 +1,54 @@
+import gzip
+from typing import Dict, Iterable, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IDENTITY = 'identity'
+ENCODING_PREFERENCE = ('br', 'gzip')
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 11
+MIN_COMPRESS_SIZE = 256
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    variants = {IDENTITY: body}
+    if len(body) < MIN_COMPRESS_SIZE:
+        return variants
+
+    variants['gzip'] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    weights = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[coding] = quality
+    return weights
+
+def negotiate(accept_encoding: Optional[str], encodings: Iterable[str]) -> str:
+    weights = _parse_accept_encoding(accept_encoding or '')
+    available = set(encodings)
+    best, best_quality = IDENTITY, 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding not in available:
+            continue
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.batch.models import dumps
+from app.batch.products import round_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_PATH = os.path.join(tempfile.gettempdir(), 'toto-oracle', 'history.sqlite3')
+
+class HistoryStore:
+    def __init__(self, db_path: str = DEFAULT_HISTORY_PATH):
+        self.db_path = db_path
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rounds ('
+                ' round TEXT PRIMARY KEY,'
+                ' toto_info BLOB NOT NULL,'
+                ' team_data BLOB NOT NULL,'
+                ' results BLOB)'
+            )
+            conn.execute('CREATE TABLE IF NOT EXISTS revision (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)')
+            conn.execute('INSERT OR IGNORE INTO revision (id, value) VALUES (1, 0)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS team_rounds ('
+                ' round TEXT NOT NULL,'
+                ' team TEXT NOT NULL,'
+                ' date TEXT NOT NULL,'
+                ' PRIMARY KEY (round, team))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_team_rounds_team ON team_rounds (team, date)')
+            if conn.execute('SELECT 1 FROM team_rounds LIMIT 1').fetchone() is None:
+                for round_number, toto_info in conn.execute('SELECT round, toto_info FROM rounds').fetchall():
+                    self._index_teams(conn, round_number, self._unpack(toto_info))
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+    
+    @staticmethod
+    def _pack(data) -> bytes:
+        return zlib.compress(dumps(data).encode('utf-8'))
+    
+    @staticmethod
+    def _unpack(blob: Optional[bytes]):
+        if blob is None:
+            return None
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+    
+    def save_round(self, toto_info: Dict, team_data: Dict, results: Optional[Dict[int, str]] = None) -> None:
+        round_number = round_key(toto_info)
+        packed_results = self._pack({str(k): v for k, v in results.items()}) if results else None
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO rounds (round, toto_info, team_data, results) VALUES (?, ?, ?, ?)'
+                ' ON CONFLICT(round) DO UPDATE SET toto_info = excluded.toto_info,'
+                ' team_data = excluded.team_data, results = COALESCE(excluded.results, rounds.results)',
+                (round_number, self._pack(toto_info), self._pack(team_data), packed_results)
+            )
+            self._index_teams(conn, round_number, toto_info)
+            # 結果付きの回が変わったときだけ版を進め、較正済みのモデルを使い回せるようにする
+            conn.execute(
+                'UPDATE revision SET value = value + 1'
+                ' WHERE EXISTS (SELECT 1 FROM rounds WHERE round = ? AND results IS NOT NULL)',
+                (round_number,)
+            )
+    
+    @staticmethod
+    def _index_teams(conn: sqlite3.Connection, round_number: str, toto_info: Dict) -> None:
+        # 開催日の集計で回ごとのBLOBを展開しなくて済むよう、チームと開催日だけを別表に持つ
+        conn.execute('DELETE FROM team_rounds WHERE round = ?', (round_number,))
+        round_date = toto_info.get('date') or ''
+        if not round_date:
+            return
+        teams = {team for match in toto_info.get('matches', []) for team in (match['home_team'], match['away_team'])}
+        conn.executemany(
+            'INSERT INTO team_rounds (round, team, date) VALUES (?, ?, ?)',
+            [(round_number, team, round_date) for team in teams]
+        )
+    
+    def save_results(self, round_number: str, results: Dict[int, str]) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'UPDATE rounds SET results = ? WHERE round = ?',
+                (self._pack({str(k): v for k, v in results.items()}), str(round_number))
+            )
+            if cursor.rowcount:
+                conn.execute('UPDATE revision SET value = value + 1')
+        if cursor.rowcount == 0:
+            logger.warning(f"結果を保存する回が見つかりません: 第{round_number}回")
+            return False
+        return True
+    
+    def iter_rounds(self, with_results_only: bool = True) -> Iterator[Tuple[Dict, Dict, Optional[Dict[int, str]]]]:
+        query = 'SELECT toto_info, team_data, results FROM rounds'
+        if with_results_only:
+            query += ' WHERE results IS NOT NULL'
+        query += ' ORDER BY CAST(round AS INTEGER), round'
+        
+        with self._connect() as conn:
+            for toto_info, team_data, results in conn.execute(query):
+                unpacked = self._unpack(results)
+                yield (
+                    self._unpack(toto_info),
+                    self._unpack(team_data),
+                    {int(k): v for k, v in unpacked.items()} if unpacked else None
+                )
+    
+    def load_rounds(self) -> List[Tuple[Dict, Dict, Dict[int, str]]]:
+        return list(self.iter_rounds(with_results_only=True))
+    
+    def latest_match_dates(self, until: str) -> Dict[str, str]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT team, MAX(date) FROM team_rounds WHERE date <= ? GROUP BY team', (until,)
+            ).fetchall()
+        return dict(rows)
+    
+    def results_revision(self) -> int:
+        with self._connect() as conn:
+            return conn.execute('SELECT value FROM revision WHERE id = 1').fetchone()[0]
+    
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM rounds').fetchone()[0]
+
+_history_store: Optional[HistoryStore] = None
+_history_store_lock = threading.Lock()
+
+def get_history_store() -> HistoryStore:
+    global _history_store
+    with _history_store_lock:
+        if _history_store is None:
+            _history_store = HistoryStore(os.environ.get('TOTO_HISTORY_DB', DEFAULT_HISTORY_PATH))
+        return _history_store
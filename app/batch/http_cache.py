@@ -0,0 +1,187 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from app.batch.metrics import HTTP_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'toto-oracle', 'http')
+
+DEFAULT_HOST_TTLS = {
+    'www.toto-dream.com': 600,
+    'data.j-league.or.jp': 3600,
+}
+
+class HttpCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, default_ttl: int = 300,
+                 host_ttls: Optional[Dict[str, int]] = None, max_bytes: int = 50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.default_ttl = default_ttl
+        self.host_ttls = dict(DEFAULT_HOST_TTLS if host_ttls is None else host_ttls)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, url: str) -> tuple:
+        key = self._key(url)
+        return os.path.join(self.cache_dir, f'{key}.json'), os.path.join(self.cache_dir, f'{key}.body')
+
+    def ttl_for(self, url: str) -> int:
+        return self.host_ttls.get(urlparse(url).netloc, self.default_ttl)
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            os.utime(body_path)
+        except (OSError, ValueError):
+            return None
+
+        meta['body'] = body
+        meta['fresh'] = time.time() - meta.get('stored_at', 0) < self.ttl_for(url)
+        return meta
+
+    def conditional_headers(self, entry: Dict) -> Dict[str, str]:
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url: str, response: requests.Response) -> None:
+        meta_path, body_path = self._paths(url)
+        meta = {
+            'url': url,
+            'stored_at': time.time(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'headers': {'Content-Type': response.headers.get('Content-Type', '')},
+        }
+        try:
+            with self._lock:
+                self._write_atomic(body_path, response.content)
+                self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+                self._evict()
+        except OSError as e:
+            logger.warning(f"HTTPキャッシュへの保存に失敗しました ({url}): {str(e)}")
+
+    def touch(self, url: str) -> None:
+        meta_path, _ = self._paths(url)
+        try:
+            with self._lock:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                meta['stored_at'] = time.time()
+                self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        except (OSError, ValueError) as e:
+            logger.warning(f"HTTPキャッシュの更新に失敗しました ({url}): {str(e)}")
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _evict(self) -> None:
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.body'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        entries.sort()
+        for _, size, body_path in entries:
+            if total_size <= self.max_bytes:
+                break
+            meta_path = body_path[:-len('.body')] + '.json'
+            for path in (body_path, meta_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_size -= size
+
+    def build_response(self, url: str, entry: Dict) -> requests.Response:
+        response = requests.Response()
+        response._content = entry['body']
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        if entry.get('etag'):
+            response.headers['ETag'] = entry['etag']
+        if entry.get('last_modified'):
+            response.headers['Last-Modified'] = entry['last_modified']
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    def record(self, outcome: str) -> None:
+        HTTP_CACHE_REQUESTS.inc(outcome=outcome)
+        with self._lock:
+            if outcome == 'hit':
+                self.hits += 1
+            elif outcome == 'revalidated':
+                self.hits += 1
+                self.revalidations += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(('.body', '.json')):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+
+_default_cache: Optional[HttpCache] = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache() -> HttpCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache(os.environ.get('TOTO_HTTP_CACHE_DIR', DEFAULT_CACHE_DIR))
+        return _default_cache
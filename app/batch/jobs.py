@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.batch.metrics import JOB_SUBMISSIONS
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+CURRENT_ROUND_JOB_KEY = 'current-round'
+ALL_ROUNDS_JOB_KEY = 'all-rounds'
+PROFILE_JOB_SUFFIX = ':profile'
+
+EVENT_HEARTBEAT_SECONDS = 15.0
+
+_current = threading.local()
+
+def _discard(event: str, data: Any) -> None:
+    pass
+
+def current_job() -> Optional['Job']:
+    return getattr(_current, 'job', None)
+
+def progress_publisher() -> Callable[[str, Any], None]:
+    job = current_job()
+    return job.publish if job is not None else _discard
+
+class Job:
+    def __init__(self, key: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+        self.events: List[Tuple[int, str, Any]] = []
+        self._events_closed = False
+        self._events_changed = threading.Condition()
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+    
+    def publish(self, event: str, data: Any, close: bool = False) -> None:
+        with self._events_changed:
+            if self._events_closed:
+                return
+            self.events.append((len(self.events) + 1, event, data))
+            self._events_closed = close
+            self._events_changed.notify_all()
+    
+    def iter_events(self, after: int = 0,
+                    heartbeat: float = EVENT_HEARTBEAT_SECONDS) -> Iterator[Optional[Tuple[int, str, Any]]]:
+        while True:
+            with self._events_changed:
+                if len(self.events) <= after and not self._events_closed:
+                    self._events_changed.wait(heartbeat)
+                pending = self.events[after:]
+                closed = self._events_closed
+            
+            yield from pending
+            after += len(pending)
+            if closed and after >= len(self.events):
+                return
+            if not pending:
+                yield None
+    
+    def to_dict(self) -> Dict:
+        data = {
+            'job_id': self.id,
+            'key': self.key,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if self.status == SUCCEEDED:
+            data['result'] = self.result
+        if self.status == FAILED:
+            data['error'] = self.error
+        return data
+
+class JobManager:
+    def __init__(self, max_workers: int = 2, max_jobs: int = 100):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch-job')
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._active: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+    
+    def _join_locked(self, key: str) -> Optional[Job]:
+        active = self._active.get(key)
+        if active is None or active.finished:
+            return None
+        logger.info(f"実行中のジョブに合流します: {active.id} ({key})")
+        JOB_SUBMISSIONS.inc(key=key, outcome='joined')
+        return active
+    
+    def join(self, key: str) -> Optional[Job]:
+        with self._lock:
+            return self._join_locked(key)
+    
+    def submit(self, key: str, func: Callable[[], Dict]) -> Job:
+        return self.submit_or_join(key, func)[0]
+    
+    def submit_or_join(self, key: str, func: Callable[[], Dict]) -> Tuple[Job, bool]:
+        with self._lock:
+            active = self._join_locked(key)
+            if active is not None:
+                return active, True
+            
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            while len(self._jobs) > self.max_jobs:
+                oldest_id = next(iter(self._jobs))
+                if not self._jobs[oldest_id].finished:
+                    break
+                self._jobs.popitem(last=False)
+        
+        logger.info(f"ジョブを登録しました: {job.id} ({key})")
+        JOB_SUBMISSIONS.inc(key=key, outcome='started')
+        self._executor.submit(self._run, job, func)
+        return job, False
+    
+    def _run(self, job: Job, func: Callable[[], Dict]) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        _current.job = job
+        try:
+            job.result = func()
+            job.status = SUCCEEDED
+        except Exception as e:
+            logger.error(f"ジョブでエラーが発生しました ({job.id}): {str(e)}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            _current.job = None
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+            job.publish('done', job.to_dict(), close=True)
+            job.done.set()
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+_job_manager: Optional[JobManager] = None
+_job_manager_lock = threading.Lock()
+
+def get_job_manager() -> JobManager:
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from app.batch.metrics import SINGLE_FLIGHT_CALLS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_DIR = os.path.join(tempfile.gettempdir(), 'toto-oracle', 'locks')
+
+T = TypeVar('T')
+
+class LockTimeout(TimeoutError):
+    pass
+
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_lock = threading.Lock()
+
+def _thread_lock(path: str) -> threading.Lock:
+    with _thread_locks_lock:
+        lock = _thread_locks.get(path)
+        if lock is None:
+            lock = threading.Lock()
+            _thread_locks[path] = lock
+        return lock
+
+class ProcessLock:
+    def __init__(self, path: str, timeout: Optional[float] = 120.0, poll_interval: float = 0.05):
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.acquired = False
+        self._thread_lock = _thread_lock(path)
+        self._file = None
+    
+    def acquire(self) -> bool:
+        started = time.monotonic()
+        if not self._thread_lock.acquire(timeout=-1 if self.timeout is None else max(0.0, self.timeout)):
+            logger.warning(f"ロックの取得がタイムアウトしました: {self.path}")
+            return False
+        if fcntl is None:
+            self.acquired = True
+            return True
+        
+        self._file = open(self.path, 'a+')
+        while True:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self.acquired = True
+                return True
+            except BlockingIOError:
+                if self.timeout is not None and time.monotonic() - started >= self.timeout:
+                    logger.warning(f"ロックの取得がタイムアウトしました: {self.path}")
+                    self._file.close()
+                    self._file = None
+                    self._thread_lock.release()
+                    return False
+                time.sleep(self.poll_interval)
+    
+    def release(self) -> None:
+        if not self.acquired:
+            return
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self.acquired = False
+        self._thread_lock.release()
+    
+    def __enter__(self) -> 'ProcessLock':
+        if not self.acquire():
+            raise LockTimeout(f'ロックを取得できませんでした: {self.path}')
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+class SingleFlight:
+    def __init__(self, lock_dir: str = DEFAULT_LOCK_DIR, timeout: Optional[float] = 120.0):
+        self.lock_dir = lock_dir
+        self.timeout = timeout
+        os.makedirs(self.lock_dir, exist_ok=True)
+    
+    def lock(self, key: str, timeout: Optional[float] = None) -> ProcessLock:
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+        return ProcessLock(os.path.join(self.lock_dir, f'{name}.lock'), self.timeout if timeout is None else timeout)
+    
+    def run(self, key: str, load: Callable[[], Optional[T]], compute: Callable[[], T]) -> T:
+        value = load()
+        if value is not None:
+            SINGLE_FLIGHT_CALLS.inc(outcome='cached')
+            return value
+        
+        with self.lock(key):
+            value = load()
+            if value is not None:
+                logger.info(f"他のワーカーの結果を再利用します: {key}")
+                SINGLE_FLIGHT_CALLS.inc(outcome='follower')
+                return value
+            SINGLE_FLIGHT_CALLS.inc(outcome='leader')
+            return compute()
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight(os.environ.get('TOTO_LOCK_DIR', DEFAULT_LOCK_DIR))
+        return _single_flight
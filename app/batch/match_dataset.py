@@ -0,0 +1,216 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from app.batch.models import FormSummary, HeadToHead, HistoricalMatch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATASET_DIR = os.path.join(tempfile.gettempdir(), 'toto-oracle', 'matches')
+CURRENT_FILE = 'CURRENT'
+META_FILE = 'meta.json'
+
+LEAGUES = ('J1', 'J2', 'J3')
+
+MATCH_COLUMNS = {
+    'date': np.int32,
+    'league': np.int8,
+    'home': np.int32,
+    'away': np.int32,
+    'home_goals': np.int16,
+    'away_goals': np.int16
+}
+INDEX_COLUMNS = {
+    'team_offsets': np.int64,
+    'team_rows': np.int32,
+    'team_dates': np.int32
+}
+
+def date_key(text: str) -> int:
+    year, month, day = (int(part) for part in text.strip().replace('-', '/').split('/')[:3])
+    return year * 10000 + month * 100 + day
+
+def format_date_key(key: int) -> str:
+    return f'{key // 10000:04d}/{key // 100 % 100:02d}/{key % 100:02d}'
+
+def read_matches_csv(path: str) -> Iterator[HistoricalMatch]:
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            yield HistoricalMatch.coerce(row)
+
+def build_match_dataset(matches: Iterable[HistoricalMatch], directory: str = DEFAULT_DATASET_DIR) -> str:
+    matches = sorted((HistoricalMatch.coerce(match) for match in matches), key=lambda m: date_key(m.date))
+    teams = sorted({team for match in matches for team in (match.home_team, match.away_team)})
+    team_ids = {team: i for i, team in enumerate(teams)}
+
+    columns = {
+        'date': [date_key(m.date) for m in matches],
+        'league': [LEAGUES.index(m.league) if m.league in LEAGUES else -1 for m in matches],
+        'home': [team_ids[m.home_team] for m in matches],
+        'away': [team_ids[m.away_team] for m in matches],
+        'home_goals': [m.home_goals for m in matches],
+        'away_goals': [m.away_goals for m in matches]
+    }
+    arrays = {name: np.array(values, dtype=MATCH_COLUMNS[name]) for name, values in columns.items()}
+
+    # チームごとの出場行を日付順に並べたCSR形式の索引。試合行は日付順なので行番号順に並べれば日付順になる
+    row_ids = np.concatenate([np.arange(len(matches)), np.arange(len(matches))]).astype(np.int32)
+    participants = np.concatenate([arrays['home'], arrays['away']])
+    order = np.lexsort((row_ids, participants))
+    arrays['team_rows'] = row_ids[order]
+    arrays['team_offsets'] = np.searchsorted(participants[order], np.arange(len(teams) + 1)).astype(np.int64)
+    arrays['team_dates'] = arrays['date'][arrays['team_rows']]
+
+    os.makedirs(directory, exist_ok=True)
+    version = f'{time.time_ns():x}'
+    version_dir = os.path.join(directory, version)
+    os.makedirs(version_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(version_dir, f'{name}.npy'), array)
+    with open(os.path.join(version_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'version': version, 'teams': teams, 'leagues': list(LEAGUES), 'matches': len(matches)},
+                  f, ensure_ascii=False)
+
+    # 読み込み中のプロセスはmmap済みの旧バージョンを使い続けられるよう、ポインタだけを差し替える
+    previous = _read_current(directory)
+    pointer = os.path.join(directory, f'{CURRENT_FILE}.{os.getpid()}')
+    with open(pointer, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path) and name not in (version, previous):
+            shutil.rmtree(path, ignore_errors=True)
+
+    logger.info(f"試合データセットを作成しました: {len(matches)}試合, {len(teams)}チーム (version {version})")
+    return version
+
+def _read_current(directory: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+class MatchDataset:
+    def __init__(self, directory: str, version: str):
+        self.directory = directory
+        self.version = version
+        version_dir = os.path.join(directory, version)
+        with open(os.path.join(version_dir, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.teams: List[str] = meta['teams']
+        self.leagues: List[str] = meta['leagues']
+        self.team_ids: Dict[str, int] = {team: i for i, team in enumerate(self.teams)}
+        # np.memmapのサブクラスを経由すると小さな索引参照ごとのオーバーヘッドが大きいため、同じマッピングをndarrayとして参照する
+        self.columns = {
+            name: np.load(os.path.join(version_dir, f'{name}.npy'), mmap_mode='r').view(np.ndarray)
+            for name in (*MATCH_COLUMNS, *INDEX_COLUMNS)
+        }
+
+    @classmethod
+    def open(cls, directory: str = DEFAULT_DATASET_DIR) -> Optional['MatchDataset']:
+        version = _read_current(directory)
+        return cls(directory, version) if version else None
+
+    def __len__(self) -> int:
+        return len(self.columns['date'])
+
+    def team_rows(self, team: str, before: Optional[str] = None, since: Optional[str] = None) -> np.ndarray:
+        team_id = self.team_ids.get(team)
+        if team_id is None:
+            return np.empty(0, dtype=np.int32)
+        start, end = self.columns['team_offsets'][team_id:team_id + 2].tolist()
+        dates = self.columns['team_dates'][start:end]
+        low = int(dates.searchsorted(date_key(since))) if since else 0
+        high = int(dates.searchsorted(date_key(before))) if before else len(dates)
+        return self.columns['team_rows'][start + low:start + high]
+
+    def _goals(self, team: str, rows: np.ndarray):
+        is_home = self.columns['home'][rows] == self.team_ids[team]
+        home_goals = self.columns['home_goals'][rows]
+        away_goals = self.columns['away_goals'][rows]
+        goals_for = np.where(is_home, home_goals, away_goals)
+        return goals_for, home_goals + away_goals - goals_for
+
+    def form(self, team: str, before: Optional[str] = None, since: Optional[str] = None,
+             last: Optional[int] = None) -> FormSummary:
+        rows = self.team_rows(team, before, since)
+        if last is not None:
+            rows = rows[-last:]
+        if len(rows) == 0:
+            return FormSummary()
+        goals_for, goals_against = self._goals(team, rows)
+        points = 3 * int(np.count_nonzero(goals_for > goals_against)) + int(np.count_nonzero(goals_for == goals_against))
+        return FormSummary(len(rows), points, int(goals_for.sum()), int(goals_against.sum()))
+
+    def head_to_head(self, team: str, opponent: str, before: Optional[str] = None,
+                     last: Optional[int] = None) -> HeadToHead:
+        opponent_id = self.team_ids.get(opponent)
+        rows = self.team_rows(team, before)
+        if opponent_id is None or len(rows) == 0:
+            return HeadToHead()
+        rows = rows[(self.columns['home'][rows] == opponent_id) | (self.columns['away'][rows] == opponent_id)]
+        if last is not None:
+            rows = rows[-last:]
+        if len(rows) == 0:
+            return HeadToHead()
+        goals_for, goals_against = self._goals(team, rows)
+        return HeadToHead(
+            len(rows),
+            int(np.count_nonzero(goals_for > goals_against)),
+            int(np.count_nonzero(goals_for == goals_against)),
+            int(np.count_nonzero(goals_for < goals_against)),
+            int(goals_for.sum()),
+            int(goals_against.sum())
+        )
+
+    def matches(self, team: str, before: Optional[str] = None, since: Optional[str] = None) -> List[HistoricalMatch]:
+        columns = self.columns
+        return [
+            HistoricalMatch(
+                format_date_key(int(columns['date'][row])),
+                self.leagues[columns['league'][row]] if columns['league'][row] >= 0 else '',
+                self.teams[columns['home'][row]],
+                self.teams[columns['away'][row]],
+                int(columns['home_goals'][row]),
+                int(columns['away_goals'][row])
+            )
+            for row in self.team_rows(team, before, since)
+        ]
+
+_match_dataset: Optional[MatchDataset] = None
+_match_dataset_lock = threading.Lock()
+
+def get_match_dataset() -> Optional[MatchDataset]:
+    global _match_dataset
+    directory = os.environ.get('TOTO_MATCH_DATASET_DIR', DEFAULT_DATASET_DIR)
+    version = _read_current(directory)
+
+    with _match_dataset_lock:
+        current = _match_dataset
+        if current is None or current.directory != directory or current.version != version:
+            _match_dataset = MatchDataset(directory, version) if version else None
+        return _match_dataset
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='J1/J2/J3の過去の試合結果から列指向の試合データセットを作成します')
+    parser.add_argument('csv', nargs='+', help='date,league,home_team,away_team,home_goals,away_goals の列を持つCSV')
+    parser.add_argument('--dir', default=os.environ.get('TOTO_MATCH_DATASET_DIR', DEFAULT_DATASET_DIR))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    matches = [match for path in args.csv for match in read_matches_csv(path)]
+    build_match_dataset(matches, args.dir)
+
+if __name__ == '__main__':
+    main()
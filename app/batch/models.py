@@ -0,0 +1,180 @@
+import json
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Union
+
+class Record:
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__dataclass_fields__ and getattr(self, key) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self.__dataclass_fields__ else None
+        return default if value is None else value
+
+    def to_dict(self) -> Dict:
+        return {f.name: getattr(self, f.name) for f in fields(self) if getattr(self, f.name) is not None}
+
+@dataclass(slots=True)
+class Match(Record):
+    match_number: int
+    home_team: str
+    away_team: str
+
+    @classmethod
+    def coerce(cls, data: Union['Match', Dict]) -> 'Match':
+        if isinstance(data, cls):
+            return data
+        return cls(data['match_number'], data['home_team'], data['away_team'])
+
+@dataclass(slots=True)
+class RecentMatch(Record):
+    result: str = 'D'
+    goals_for: int = 1
+    goals_against: int = 1
+    opponent: str = '対戦相手'
+    date: Optional[str] = None
+
+    @classmethod
+    def coerce(cls, data: Union['RecentMatch', Dict]) -> 'RecentMatch':
+        if isinstance(data, cls):
+            return data
+        return cls(
+            data.get('result', 'D'),
+            data.get('goals_for', 1),
+            data.get('goals_against', 1),
+            data.get('opponent', '対戦相手'),
+            data.get('date')
+        )
+
+@dataclass(slots=True)
+class VenueStats(Record):
+    wins: int = 3
+    draws: int = 3
+    losses: int = 4
+
+    @property
+    def total(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    @classmethod
+    def coerce(cls, data: Union['VenueStats', Dict, None]) -> 'VenueStats':
+        if isinstance(data, cls):
+            return data
+        if data is None:
+            return cls()
+        return cls(data['wins'], data['draws'], data['losses'])
+
+@dataclass(slots=True)
+class TeamStats(Record):
+    recent_matches: List[RecentMatch] = field(default_factory=list)
+    ranking: int = 10
+    home_stats: VenueStats = field(default_factory=VenueStats)
+    away_stats: VenueStats = field(default_factory=VenueStats)
+
+    @classmethod
+    def coerce(cls, data: Union['TeamStats', Dict]) -> 'TeamStats':
+        if isinstance(data, cls):
+            return data
+        return cls(
+            [RecentMatch.coerce(match) for match in data.get('recent_matches', [])],
+            data.get('ranking', 10),
+            VenueStats.coerce(data.get('home_stats')),
+            VenueStats.coerce(data.get('away_stats'))
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            'recent_matches': [match.to_dict() for match in self.recent_matches],
+            'ranking': self.ranking,
+            'home_stats': self.home_stats.to_dict(),
+            'away_stats': self.away_stats.to_dict()
+        }
+
+@dataclass(slots=True)
+class Prediction(Record):
+    match_number: int
+    home_team: str
+    away_team: str
+    prediction: str
+    confidence: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'match_number': self.match_number,
+            'home_team': self.home_team,
+            'away_team': self.away_team,
+            'prediction': self.prediction
+        }
+
+@dataclass(slots=True)
+class MatchProbabilities(Record):
+    match_number: int
+    home_team: str
+    away_team: str
+    home_win: float
+    draw: float
+    away_win: float
+
+    def outcome(self, outcome: str) -> float:
+        return {'1': self.home_win, '0': self.draw, '2': self.away_win}[outcome]
+
+    @classmethod
+    def coerce(cls, data: Union['MatchProbabilities', Dict]) -> 'MatchProbabilities':
+        if isinstance(data, cls):
+            return data
+        return cls(data['match_number'], data['home_team'], data['away_team'],
+                   data['home_win'], data['draw'], data['away_win'])
+
+@dataclass(slots=True)
+class HistoricalMatch(Record):
+    date: str
+    league: str
+    home_team: str
+    away_team: str
+    home_goals: int
+    away_goals: int
+
+    @classmethod
+    def coerce(cls, data: Union['HistoricalMatch', Dict]) -> 'HistoricalMatch':
+        if isinstance(data, cls):
+            return data
+        return cls(data['date'], data.get('league', 'J1'), data['home_team'], data['away_team'],
+                   int(data['home_goals']), int(data['away_goals']))
+
+@dataclass(slots=True)
+class FormSummary(Record):
+    matches: int = 0
+    points: int = 0
+    goals_for: int = 0
+    goals_against: int = 0
+
+    @property
+    def points_per_game(self) -> float:
+        return self.points / self.matches if self.matches else 0.0
+
+    @property
+    def goal_diff_per_game(self) -> float:
+        return (self.goals_for - self.goals_against) / self.matches if self.matches else 0.0
+
+@dataclass(slots=True)
+class HeadToHead(Record):
+    matches: int = 0
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    goals_for: int = 0
+    goals_against: int = 0
+
+def json_default(obj: Any) -> Any:
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=json_default)
@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import random
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.batch.scraper import TotoScraper
+from app.batch.predictor import TotoPredictor
+from app.batch.probability import ProbabilisticPredictor
+from app.batch.http_cache import get_default_cache
+from app.batch.store import get_prediction_store
+from app.batch.history import get_history_store
+from app.batch.jobs import ALL_ROUNDS_JOB_KEY, CURRENT_ROUND_JOB_KEY, current_job, progress_publisher
+from app.batch.locks import get_single_flight
+from app.batch.match_dataset import get_match_dataset
+from app.batch.models import dumps
+from app.batch.metrics import BATCH_RUNS, stage_timer
+from app.batch.products import round_key
+from app.batch.profiling import SamplingProfiler, save_profile
+from app.batch.shared_cache import get_shared_cache
+from app.batch.team_state import get_team_state_store
+
+logger = logging.getLogger(__name__)
+
+SHARED_RESULT_TTL = 60
+
+class BatchError(Exception):
+    pass
+
+def _seeded_rng() -> Optional[random.Random]:
+    seed = os.environ.get('TOTO_RANDOM_SEED')
+    return random.Random(int(seed)) if seed else None
+
+def _make_scraper() -> TotoScraper:
+    return TotoScraper(cache=get_default_cache(), rng=_seeded_rng(), team_state=get_team_state_store(),
+                       single_flight=get_single_flight())
+
+def _make_predictor() -> TotoPredictor:
+    return TotoPredictor(rng=_seeded_rng(), shared_cache=get_shared_cache(), match_dataset=get_match_dataset())
+
+def run_batch_pipeline(all_rounds: bool = False, fresh: bool = False) -> Dict:
+    shared_key = f'batch:{ALL_ROUNDS_JOB_KEY if all_rounds else CURRENT_ROUND_JOB_KEY}'
+    publish = progress_publisher()
+    
+    def load() -> Optional[Dict]:
+        if fresh:
+            return None
+        payload = get_shared_cache().get(shared_key)
+        return json.loads(payload) if payload is not None else None
+    
+    def compute() -> Dict:
+        result = _run_all_rounds_pipeline(publish) if all_rounds else _run_batch_pipeline(publish)
+        get_shared_cache().set(shared_key, dumps(result), SHARED_RESULT_TTL)
+        return result
+    
+    try:
+        with stage_timer('total'):
+            result = get_single_flight().run(shared_key, load, compute)
+    except Exception:
+        BATCH_RUNS.inc(outcome='failure')
+        raise
+    BATCH_RUNS.inc(outcome='success')
+    return result
+
+def run_profiled_batch_pipeline(all_rounds: bool = False) -> Dict:
+    job = current_job()
+    name = job.id if job is not None else uuid.uuid4().hex
+    
+    # 共有キャッシュの結果を返すだけの実行は計測しても意味がないため、必ず再計算する
+    with SamplingProfiler() as profiler:
+        result = run_batch_pipeline(all_rounds=all_rounds, fresh=True)
+    return {**result, 'profile': save_profile(name, profiler)}
+
+def _team_stats_listener(publish: Callable[[str, Any], None]) -> Callable[[str, Dict], None]:
+    def listener(team_name: str, stats: Dict) -> None:
+        publish('team_stats', {'team': team_name, 'ranking': stats['ranking']})
+    return listener
+
+def _publish_predictions(publish: Callable[[str, Any], None], toto_info: Dict, predictions: List[Dict]) -> None:
+    key = round_key(toto_info)
+    for prediction in predictions:
+        publish('prediction', {'round': key, **prediction})
+
+def _run_batch_pipeline(publish: Callable[[str, Any], None]) -> Dict:
+    logger.info("バッチ処理を開始します")
+    
+    scraper = _make_scraper()
+    predictor = _make_predictor()
+    
+    toto_info = scraper.get_latest_toto_info()
+    if not toto_info:
+        raise BatchError('toto情報の取得に失敗しました')
+    publish('toto_info', toto_info)
+    
+    with stage_timer('team_stats'):
+        scheduled_dates = get_history_store().latest_match_dates(until=datetime.now().strftime('%Y/%m/%d'))
+        team_data = scraper.get_team_performance_data(
+            toto_info['matches'], scheduled_dates, on_team_stats=_team_stats_listener(publish))
+    if not team_data:
+        raise BatchError('チーム成績データの取得に失敗しました')
+    
+    with stage_timer('predict'):
+        predictions = predictor.predict_matches(toto_info, team_data)
+        model = ProbabilisticPredictor.from_history(get_history_store(), predictor)
+        probabilities = model.predict_probabilities(toto_info, team_data)
+    _publish_predictions(publish, toto_info, predictions)
+    
+    with stage_timer('store'):
+        get_history_store().save_round(toto_info, team_data)
+        result = {
+            'toto_info': toto_info,
+            'predictions': predictions,
+            'probabilities': probabilities
+        }
+        get_prediction_store().save(result)
+    
+    logger.info("バッチ処理が完了しました")
+    
+    return result
+
+def _run_all_rounds_pipeline(publish: Callable[[str, Any], None]) -> Dict:
+    logger.info("全回一括のバッチ処理を開始します")
+    
+    scraper = _make_scraper()
+    predictor = _make_predictor()
+    
+    rounds = scraper.get_open_rounds_info()
+    if not rounds:
+        raise BatchError('販売中の回の取得に失敗しました')
+    for toto_info in rounds:
+        publish('toto_info', toto_info)
+    
+    with stage_timer('team_stats'):
+        scheduled_dates = get_history_store().latest_match_dates(until=datetime.now().strftime('%Y/%m/%d'))
+        matches = [match for toto_info in rounds for match in toto_info['matches']]
+        team_data = scraper.get_team_performance_data(
+            matches, scheduled_dates, on_team_stats=_team_stats_listener(publish))
+    if not team_data:
+        raise BatchError('チーム成績データの取得に失敗しました')
+    
+    with stage_timer('predict'):
+        model = ProbabilisticPredictor.from_history(get_history_store(), predictor)
+        round_team_data = [_round_team_data(toto_info, team_data) for toto_info in rounds]
+        results = [
+            {
+                'toto_info': toto_info,
+                'predictions': predictor.predict_matches(toto_info, data),
+                'probabilities': model.predict_probabilities(toto_info, data)
+            }
+            for toto_info, data in zip(rounds, round_team_data)
+        ]
+    for result in results:
+        _publish_predictions(publish, result['toto_info'], result['predictions'])
+    
+    with stage_timer('store'):
+        # 現在のtotoの回が最新の予想として参照されるよう、最後に保存する
+        for result, data in reversed(list(zip(results, round_team_data))):
+            get_history_store().save_round(result['toto_info'], data)
+            get_prediction_store().save(result)
+    
+    logger.info(f"全回一括のバッチ処理が完了しました: {', '.join(round_key(r['toto_info']) for r in results)}")
+    
+    return {'rounds': results}
+
+def _round_team_data(toto_info: Dict, team_data: Dict) -> Dict:
+    return {
+        team_name: team_data[team_name]
+        for match in toto_info['matches']
+        for team_name in (match['home_team'], match['away_team'])
+        if team_name in team_data
+    }
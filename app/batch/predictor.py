@@ -1,87 +1,176 @@
+import hashlib
+import json
 import logging
-from typing import Dict, List, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 import random
 
+from app.batch.locks import get_single_flight
+from app.batch.match_dataset import MatchDataset
+from app.batch.metrics import PREDICTION_CACHE_REQUESTS
+from app.batch.models import Match, Prediction, RecentMatch, TeamStats, dumps, json_default
+from app.batch.shared_cache import SharedCache, get_shared_cache
+
 logger = logging.getLogger(__name__)
 
+PREDICTION_CACHE_SIZE = 128
+SHARED_PREDICTION_TTL = 24 * 60 * 60
+SHARED_PREDICTION_PREFIX = 'predict:'
+MIN_SEASON_MATCHES = 3
+FALLBACK_FORM_MATCHES = 10
+HEAD_TO_HEAD_MATCHES = 10
+
+_prediction_cache: 'OrderedDict[str, List[Prediction]]' = OrderedDict()
+_prediction_cache_lock = threading.Lock()
+
+def clear_prediction_cache(shared_cache: Optional[SharedCache] = None) -> None:
+    with _prediction_cache_lock:
+        _prediction_cache.clear()
+    (shared_cache or get_shared_cache()).delete_prefix(SHARED_PREDICTION_PREFIX)
+
+def compute_input_hash(toto_info: Dict, team_data: Dict) -> str:
+    payload = json.dumps(
+        {'toto_info': toto_info, 'team_data': team_data},
+        ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=json_default
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
 class TotoPredictor:
-    def __init__(self):
-        self.home_advantage = 5
-        self.recent_matches_weight = 0.4
-        self.ranking_weight = 0.3
-        self.home_away_weight = 0.3
+    def __init__(self, home_advantage: float = 5, recent_matches_weight: float = 0.4,
+                 ranking_weight: float = 0.3, home_away_weight: float = 0.3,
+                 rng: Optional[random.Random] = None, shared_cache: Optional[SharedCache] = None,
+                 match_dataset: Optional[MatchDataset] = None, season_form_weight: float = 0.2,
+                 head_to_head_weight: float = 0.1, close_match_prediction: Optional[str] = None):
+        self.home_advantage = home_advantage
+        self.recent_matches_weight = recent_matches_weight
+        self.ranking_weight = ranking_weight
+        self.home_away_weight = home_away_weight
+        self.rng = rng
+        self.shared_cache = shared_cache
+        self.match_dataset = match_dataset
+        self.season_form_weight = season_form_weight
+        self.head_to_head_weight = head_to_head_weight
+        self.close_match_prediction = close_match_prediction
+    
+    def _params_key(self) -> Tuple:
+        key = (self.home_advantage, self.recent_matches_weight, self.ranking_weight, self.home_away_weight)
+        if self.close_match_prediction is not None:
+            key += (f'close={self.close_match_prediction}',)
+        if self.match_dataset is None:
+            return key
+        return key + (self.season_form_weight, self.head_to_head_weight, self.match_dataset.version)
     
     def predict_matches(self, toto_info: Dict, team_data: Dict) -> List[Dict]:
+        # 明示的に渡された乱数は呼び出しごとに状態が進み、キャッシュキーで同一性を表せないため、キャッシュを使わない
+        if self.rng is not None:
+            PREDICTION_CACHE_REQUESTS.inc(outcome='bypass')
+            return [prediction.to_dict() for prediction in self._predict_matches(toto_info, team_data, self.rng)]
+        
+        input_hash = compute_input_hash(toto_info, team_data)
+        cache_key = f'{self._params_key()}:{input_hash}'
+        
+        with _prediction_cache_lock:
+            cached = _prediction_cache.get(cache_key)
+            if cached is not None:
+                _prediction_cache.move_to_end(cache_key)
+        PREDICTION_CACHE_REQUESTS.inc(outcome='hit' if cached is not None else 'miss')
+        if cached is not None:
+            logger.info("キャッシュ済みの予想を使用します")
+            return [prediction.to_dict() for prediction in cached]
+        
+        rng = random.Random(input_hash)
+        if self.shared_cache is None:
+            predictions = self._predict_matches(toto_info, team_data, rng)
+        else:
+            shared_key = SHARED_PREDICTION_PREFIX + cache_key
+            predictions = get_single_flight().run(
+                shared_key,
+                lambda: self._load_shared_predictions(shared_key),
+                lambda: self._predict_and_share(shared_key, toto_info, team_data, rng)
+            )
+        
+        with _prediction_cache_lock:
+            _prediction_cache[cache_key] = predictions
+            while len(_prediction_cache) > PREDICTION_CACHE_SIZE:
+                _prediction_cache.popitem(last=False)
+        
+        return [prediction.to_dict() for prediction in predictions]
+    
+    def _load_shared_predictions(self, shared_key: str) -> Optional[List[Prediction]]:
+        payload = self.shared_cache.get(shared_key)
+        if payload is None:
+            return None
+        return [Prediction(**item) for item in json.loads(payload)]
+    
+    def _predict_and_share(self, shared_key: str, toto_info: Dict, team_data: Dict,
+                           rng: random.Random) -> List[Prediction]:
+        predictions = self._predict_matches(toto_info, team_data, rng)
+        self.shared_cache.set(shared_key, dumps(predictions), SHARED_PREDICTION_TTL)
+        return predictions
+    
+    def _predict_matches(self, toto_info: Dict, team_data: Dict, rng: random.Random) -> List[Prediction]:
         logger.info("試合予想を開始します")
         
-        predictions = []
         match_scores = []
         
         for match in toto_info['matches']:
-            home_team = match['home_team']
-            away_team = match['away_team']
+            match = Match.coerce(match)
             
-            home_stats = team_data.get(home_team, {})
-            away_stats = team_data.get(away_team, {})
+            home_stats = team_data.get(match.home_team)
+            away_stats = team_data.get(match.away_team)
             
-            prediction, confidence = self._predict_single_match(home_stats, away_stats)
+            adjustment = self._history_adjustment(match.home_team, match.away_team, toto_info.get('date'))
+            prediction, confidence = self._predict_single_match(home_stats, away_stats, rng, adjustment)
             
-            match_scores.append({
-                'match_number': match['match_number'],
-                'home_team': home_team,
-                'away_team': away_team,
-                'prediction': prediction,
-                'confidence': confidence
-            })
+            match_scores.append(Prediction(match.match_number, match.home_team, match.away_team, prediction, confidence))
         
-        match_scores.sort(key=lambda x: x['confidence'])
+        match_scores.sort(key=lambda x: x.confidence)
         
         draw_count = 0
         max_draws = 3
         
         for i, match_score in enumerate(match_scores):
             if draw_count < max_draws and i < len(match_scores) // 2:
-                if match_score['confidence'] < 60:
-                    match_score['prediction'] = '0'
+                if match_score.confidence < 60:
+                    match_score.prediction = '0'
                     draw_count += 1
-            
-            predictions.append({
-                'match_number': match_score['match_number'],
-                'home_team': match_score['home_team'],
-                'away_team': match_score['away_team'],
-                'prediction': match_score['prediction']
-            })
         
-        predictions.sort(key=lambda x: x['match_number'])
+        predictions = sorted(match_scores, key=lambda x: x.match_number)
         
         logger.info(f"予想完了: {len(predictions)}試合")
         return predictions
     
-    def _predict_single_match(self, home_stats: Dict, away_stats: Dict) -> tuple:
+    def _predict_single_match(self, home_stats: Optional[TeamStats], away_stats: Optional[TeamStats],
+                              rng: Optional[random.Random] = None, adjustment: float = 0.0) -> tuple:
+        rng = rng or self.rng or random
         try:
             home_score = self._calculate_team_score(home_stats, is_home=True)
             away_score = self._calculate_team_score(away_stats, is_home=False)
             
-            score_diff = home_score - away_score
+            score_diff = home_score - away_score + adjustment
             confidence = min(abs(score_diff) * 2, 95)
             
             if score_diff > 5:
                 return '1', confidence
             elif score_diff < -5:
                 return '2', confidence
+            elif self.close_match_prediction is not None:
+                return self.close_match_prediction, max(confidence, 30)
             else:
-                return random.choice(['1', '0', '2']), max(confidence, 30)
+                return rng.choice(['1', '0', '2']), max(confidence, 30)
                 
         except Exception as e:
             logger.warning(f"予想計算エラー: {str(e)}")
-            return random.choice(['1', '0', '2']), 50
+            return rng.choice(['1', '0', '2']), 50
     
-    def _calculate_team_score(self, team_stats: Dict, is_home: bool) -> float:
+    def _calculate_team_score(self, team_stats: Optional[TeamStats], is_home: bool) -> float:
         if not team_stats:
             return 50 + (self.home_advantage if is_home else 0)
         
-        recent_score = self._calculate_recent_form_score(team_stats.get('recent_matches', []))
-        ranking_score = self._calculate_ranking_score(team_stats.get('ranking', 10))
+        team_stats = TeamStats.coerce(team_stats)
+        recent_score = self._calculate_recent_form_score(team_stats.recent_matches)
+        ranking_score = self._calculate_ranking_score(team_stats.ranking)
         venue_score = self._calculate_venue_score(team_stats, is_home)
         
         total_score = (
@@ -95,7 +184,7 @@ class TotoPredictor:
         
         return total_score
     
-    def _calculate_recent_form_score(self, recent_matches: List[Dict]) -> float:
+    def _calculate_recent_form_score(self, recent_matches: List[RecentMatch]) -> float:
         if not recent_matches:
             return 50
         
@@ -103,16 +192,15 @@ class TotoPredictor:
         total_goal_diff = 0
         
         for match in recent_matches[:5]:
-            result = match.get('result', 'D')
-            goals_for = match.get('goals_for', 1)
-            goals_against = match.get('goals_against', 1)
+            match = RecentMatch.coerce(match)
+            result = match.result
             
             if result == 'W':
                 total_points += 3
             elif result == 'D':
                 total_points += 1
             
-            total_goal_diff += (goals_for - goals_against)
+            total_goal_diff += (match.goals_for - match.goals_against)
         
         avg_points = total_points / len(recent_matches)
         avg_goal_diff = total_goal_diff / len(recent_matches)
@@ -121,6 +209,35 @@ class TotoPredictor:
         
         return max(0, min(100, form_score))
     
+    def _history_adjustment(self, home_team: str, away_team: str, before: Optional[str]) -> float:
+        dataset = self.match_dataset
+        if dataset is None or not before:
+            return 0.0
+        
+        try:
+            season_start = f'{before[:4]}/01/01'
+            form_diff = (self._calculate_season_form_score(dataset, home_team, before, season_start)
+                         - self._calculate_season_form_score(dataset, away_team, before, season_start))
+            
+            head_to_head = dataset.head_to_head(home_team, away_team, before, last=HEAD_TO_HEAD_MATCHES)
+            head_to_head_score = ((head_to_head.wins - head_to_head.losses) / head_to_head.matches * 50
+                                  if head_to_head.matches else 0.0)
+        except Exception as e:
+            logger.warning(f"過去の対戦成績の計算に失敗しました: {str(e)}")
+            return 0.0
+        
+        return form_diff * self.season_form_weight + head_to_head_score * self.head_to_head_weight
+    
+    def _calculate_season_form_score(self, dataset: MatchDataset, team: str, before: str, since: str) -> float:
+        form = dataset.form(team, before, since=since)
+        if form.matches < MIN_SEASON_MATCHES:
+            form = dataset.form(team, before, last=FALLBACK_FORM_MATCHES)
+        if form.matches == 0:
+            return 50
+        
+        form_score = (form.points_per_game / 3) * 60 + form.goal_diff_per_game * 5 + 40
+        return max(0, min(100, form_score))
+    
     def _calculate_ranking_score(self, ranking: int) -> float:
         if ranking <= 0:
             ranking = 10
@@ -128,15 +245,15 @@ class TotoPredictor:
         ranking_score = max(0, 100 - (ranking - 1) * 4)
         return ranking_score
     
-    def _calculate_venue_score(self, team_stats: Dict, is_home: bool) -> float:
-        venue_key = 'home_stats' if is_home else 'away_stats'
-        venue_stats = team_stats.get(venue_key, {'wins': 3, 'draws': 3, 'losses': 4})
+    def _calculate_venue_score(self, team_stats: TeamStats, is_home: bool) -> float:
+        team_stats = TeamStats.coerce(team_stats)
+        venue_stats = team_stats.home_stats if is_home else team_stats.away_stats
         
-        total_games = venue_stats['wins'] + venue_stats['draws'] + venue_stats['losses']
+        total_games = venue_stats.total
         if total_games == 0:
             return 50
         
-        win_rate = venue_stats['wins'] / total_games
+        win_rate = venue_stats.wins / total_games
         venue_score = win_rate * 80 + 20
         
-        return venue_score
\ No newline at end of file
+        return venue_score
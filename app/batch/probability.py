@@ -0,0 +1,121 @@
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.batch.history import HistoryStore
+from app.batch.models import Match, MatchProbabilities
+from app.batch.predictor import TotoPredictor
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ('1', '0', '2')
+
+DEFAULT_SCALE = 6.0
+DEFAULT_DRAW_MARGIN = 4.0
+MIN_CALIBRATION_MATCHES = 50
+
+SCALE_GRID = np.linspace(1.0, 20.0, 39)
+DRAW_MARGIN_GRID = np.linspace(0.0, 15.0, 31)
+
+FITTED_CACHE_SIZE = 8
+
+_fitted: 'OrderedDict[Tuple, Tuple[float, float]]' = OrderedDict()
+_fitted_lock = threading.Lock()
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def outcome_probabilities(score_diff: float, scale: float = DEFAULT_SCALE,
+                          draw_margin: float = DEFAULT_DRAW_MARGIN) -> Tuple[float, float, float]:
+    home_win = 1.0 / (1.0 + math.exp(-(score_diff - draw_margin) / scale))
+    away_win = 1.0 / (1.0 + math.exp(-(-score_diff - draw_margin) / scale))
+    return home_win, 1.0 - home_win - away_win, away_win
+
+def _grid_log_loss(diffs: np.ndarray, outcomes: np.ndarray, scale: float) -> np.ndarray:
+    margins = DRAW_MARGIN_GRID[:, None]
+    home_win = _sigmoid((diffs[None, :] - margins) / scale)
+    away_win = _sigmoid((-diffs[None, :] - margins) / scale)
+    probabilities = np.stack([home_win, 1.0 - home_win - away_win, away_win])
+    picked = probabilities[outcomes, :, np.arange(len(outcomes))]
+    return -np.log(np.clip(picked, 1e-12, 1.0)).mean(axis=0)
+
+class ProbabilisticPredictor:
+    def __init__(self, predictor: Optional[TotoPredictor] = None, scale: float = DEFAULT_SCALE,
+                 draw_margin: float = DEFAULT_DRAW_MARGIN):
+        self.predictor = predictor or TotoPredictor()
+        self.scale = scale
+        self.draw_margin = draw_margin
+
+    @classmethod
+    def from_history(cls, store: HistoryStore, predictor: Optional[TotoPredictor] = None) -> 'ProbabilisticPredictor':
+        model = cls(predictor)
+        key = (store.db_path, store.results_revision(), model.predictor._params_key())
+        with _fitted_lock:
+            fitted = _fitted.get(key)
+            if fitted is not None:
+                _fitted.move_to_end(key)
+        if fitted is not None:
+            model.scale, model.draw_margin = fitted
+            return model
+        
+        rounds = store.load_rounds()
+        if sum(len(results) for _, _, results in rounds) >= MIN_CALIBRATION_MATCHES:
+            model.calibrate(rounds)
+        with _fitted_lock:
+            _fitted[key] = (model.scale, model.draw_margin)
+            while len(_fitted) > FITTED_CACHE_SIZE:
+                _fitted.popitem(last=False)
+        return model
+
+    def score_diff(self, home_stats: Optional[Dict], away_stats: Optional[Dict],
+                   match: Optional[Match] = None, before: Optional[str] = None) -> float:
+        diff = (self.predictor._calculate_team_score(home_stats, is_home=True)
+                - self.predictor._calculate_team_score(away_stats, is_home=False))
+        if match is not None:
+            diff += self.predictor._history_adjustment(match.home_team, match.away_team, before)
+        return diff
+
+    def predict_probabilities(self, toto_info: Dict, team_data: Dict) -> List[MatchProbabilities]:
+        probabilities = []
+        for match in toto_info['matches']:
+            match = Match.coerce(match)
+            diff = self.score_diff(team_data.get(match.home_team), team_data.get(match.away_team),
+                                   match, toto_info.get('date'))
+            home_win, draw, away_win = outcome_probabilities(diff, self.scale, self.draw_margin)
+            probabilities.append(MatchProbabilities(
+                match.match_number, match.home_team, match.away_team,
+                round(home_win, 4), round(draw, 4), round(away_win, 4)
+            ))
+        return probabilities
+
+    def calibrate(self, rounds: List[Tuple[Dict, Dict, Dict[int, str]]]) -> Dict:
+        diffs = []
+        outcomes = []
+        for toto_info, team_data, results in rounds:
+            for match in toto_info['matches']:
+                match = Match.coerce(match)
+                result = results.get(match.match_number)
+                if result not in OUTCOMES:
+                    continue
+                diffs.append(self.score_diff(team_data.get(match.home_team), team_data.get(match.away_team),
+                                             match, toto_info.get('date')))
+                outcomes.append(OUTCOMES.index(result))
+
+        if not diffs:
+            return {'matches': 0, 'scale': self.scale, 'draw_margin': self.draw_margin, 'log_loss': None}
+
+        diffs = np.array(diffs, dtype=np.float64)
+        outcomes = np.array(outcomes, dtype=np.int64)
+        losses = np.stack([_grid_log_loss(diffs, outcomes, scale) for scale in SCALE_GRID])
+        scale_index, margin_index = np.unravel_index(np.argmin(losses), losses.shape)
+
+        self.scale = float(SCALE_GRID[scale_index])
+        self.draw_margin = float(DRAW_MARGIN_GRID[margin_index])
+        log_loss = float(losses[scale_index, margin_index])
+        logger.info(f"確率モデルを較正しました: scale={self.scale:.2f}, draw_margin={self.draw_margin:.2f}, "
+                    f"log_loss={log_loss:.4f} ({len(diffs)}試合)")
+        return {'matches': len(diffs), 'scale': self.scale, 'draw_margin': self.draw_margin, 'log_loss': log_loss}
@@ -0,0 +1,20 @@
+from typing import Dict
+
+DEFAULT_PRODUCT = 'toto'
+
+PRODUCT_MATCH_COUNTS = {
+    'toto': 13,
+    'minitoto': 5,
+    'winner': 1
+}
+
+PRODUCT_LABELS = {
+    'toto': 'toto',
+    'minitoto': 'mini toto',
+    'winner': 'WINNER'
+}
+
+def round_key(toto_info: Dict) -> str:
+    round_number = str(toto_info.get('round', '未定'))
+    product = toto_info.get('product', DEFAULT_PRODUCT)
+    return round_number if product == DEFAULT_PRODUCT else f'{product}:{round_number}'
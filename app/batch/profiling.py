@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'toto-oracle', 'profiles')
+DEFAULT_INTERVAL = 0.005
+SUMMARY_TOP = 50
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', os.path.basename(code.co_filename))
+    return f'{module}:{code.co_qualname}'.replace(';', ':')
+
+def _stack(frame) -> Tuple[str, ...]:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+class SamplingProfiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.elapsed = 0.0
+        self._excluded: set = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'SamplingProfiler':
+        # 呼び出し元のスレッドと、計測中に起動したスレッド（並列取得のワーカーなど）だけを対象にする
+        self._excluded = {thread.ident for thread in threading.enumerate()} - {threading.get_ident()}
+        self._stop.clear()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def __enter__(self) -> 'SamplingProfiler':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or ident in self._excluded:
+                    continue
+                self.samples[(names.get(ident, str(ident)),) + _stack(frame)] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f'{";".join(stack)} {count}\n' for stack, count in sorted(self.samples.items()))
+
+    def summary(self, top: int = SUMMARY_TOP) -> Dict:
+        self_samples: Counter = Counter()
+        total_samples: Counter = Counter()
+        for stack, count in self.samples.items():
+            frames = stack[1:]
+            if not frames:
+                continue
+            self_samples[frames[-1]] += count
+            for label in set(frames):
+                total_samples[label] += count
+
+        functions = [
+            {
+                'function': label,
+                'self_samples': self_samples[label],
+                'total_samples': total,
+                'self_seconds': round(self_samples[label] * self.interval, 4),
+                'total_seconds': round(total * self.interval, 4)
+            }
+            for label, total in total_samples.most_common(top)
+        ]
+        return {
+            'interval': self.interval,
+            'elapsed': round(self.elapsed, 4),
+            'sample_count': self.sample_count,
+            'functions': functions
+        }
+
+def profile_dir() -> str:
+    return os.environ.get('TOTO_PROFILE_DIR', DEFAULT_PROFILE_DIR)
+
+def save_profile(name: str, profiler: SamplingProfiler, directory: Optional[str] = None) -> Dict:
+    directory = directory or profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    collapsed_path = os.path.join(directory, f'{name}.collapsed')
+    summary_path = os.path.join(directory, f'{name}.json')
+
+    with open(collapsed_path, 'w', encoding='utf-8') as f:
+        f.write(profiler.collapsed())
+    summary = profiler.summary()
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"プロファイルを保存しました: {collapsed_path} ({profiler.sample_count}サンプル)")
+    return {
+        'name': name,
+        'collapsed': os.path.basename(collapsed_path),
+        'summary': os.path.basename(summary_path),
+        'elapsed': summary['elapsed'],
+        'sample_count': summary['sample_count']
+    }
+
+def list_profiles(directory: Optional[str] = None) -> List[str]:
+    directory = directory or profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if name.endswith(('.collapsed', '.json')))
@@ -0,0 +1,97 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from app.batch.metrics import RATE_LIMIT_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLIENT_LIMIT = '5/60'
+DEFAULT_GLOBAL_LIMIT = '30/60'
+MAX_TRACKED_CLIENTS = 10000
+
+def parse_limit(text: str) -> Optional[Tuple[float, float]]:
+    text = text.strip().lower()
+    if text in ('', '0', 'off'):
+        return None
+    count, _, seconds = text.partition('/')
+    capacity, period = float(count), float(seconds or 1)
+    if capacity <= 0 or period <= 0:
+        raise ValueError(f'レート制限の指定が不正です: {text}')
+    return capacity, period
+
+class TokenBucket:
+    def __init__(self, capacity: float, period: float, now: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated_at = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def retry_after(self) -> float:
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+class RateLimiter:
+    def __init__(self, client_limit: Optional[Tuple[float, float]], global_limit: Optional[Tuple[float, float]],
+                 max_clients: int = MAX_TRACKED_CLIENTS, clock: Callable[[], float] = time.monotonic):
+        self.client_limit = client_limit
+        self.global_limit = global_limit
+        self.max_clients = max_clients
+        self.clock = clock
+        self._clients: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self._global: Optional[TokenBucket] = TokenBucket(*global_limit, clock()) if global_limit else None
+        self._lock = threading.Lock()
+
+    def _client_bucket(self, client: str, now: float) -> Optional[TokenBucket]:
+        if self.client_limit is None:
+            return None
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = TokenBucket(*self.client_limit, now)
+            self._clients[client] = bucket
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+        return bucket
+
+    def acquire(self, client: str) -> Tuple[bool, float]:
+        with self._lock:
+            now = self.clock()
+            buckets = [('client', self._client_bucket(client, now)), ('global', self._global)]
+            for scope, bucket in buckets:
+                if bucket is None:
+                    continue
+                bucket.refill(now)
+                if bucket.tokens < 1:
+                    RATE_LIMIT_DECISIONS.inc(outcome=f'limited_{scope}')
+                    return False, bucket.retry_after()
+
+            for _, bucket in buckets:
+                if bucket is not None:
+                    bucket.tokens -= 1
+        RATE_LIMIT_DECISIONS.inc(outcome='allowed')
+        return True, 0.0
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(
+                parse_limit(os.environ.get('TOTO_RATE_LIMIT_CLIENT', DEFAULT_CLIENT_LIMIT)),
+                parse_limit(os.environ.get('TOTO_RATE_LIMIT_GLOBAL', DEFAULT_GLOBAL_LIMIT))
+            )
+        return _rate_limiter
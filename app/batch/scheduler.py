@@ -0,0 +1,151 @@
+import argparse
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.batch.jobs import ALL_ROUNDS_JOB_KEY, CURRENT_ROUND_JOB_KEY, JobManager, get_job_manager
+
+logger = logging.getLogger(__name__)
+
+JST = timezone(timedelta(hours=9))
+
+DEADLINE_FORMATS = ('%Y/%m/%d %H:%M', '%Y/%m/%d')
+
+# 締切までの残り時間（秒）がしきい値以上のときの実行間隔（秒）。しきい値の大きい順に並べる
+DEFAULT_CADENCE: Tuple[Tuple[float, float], ...] = (
+    (3 * 24 * 60 * 60, 6 * 60 * 60),
+    (24 * 60 * 60, 60 * 60),
+    (3 * 60 * 60, 30 * 60),
+    (0, 10 * 60)
+)
+AFTER_DEADLINE_INTERVAL = 60 * 60
+RETRY_INTERVAL = 5 * 60
+
+def parse_deadline(text: Optional[str]) -> Optional[datetime]:
+    if not text:
+        return None
+    for fmt in DEADLINE_FORMATS:
+        try:
+            return datetime.strptime(text.strip(), fmt).replace(tzinfo=JST)
+        except ValueError:
+            continue
+    return None
+
+def parse_cadence(text: str) -> Tuple[Tuple[float, float], ...]:
+    cadence = []
+    for item in text.split(','):
+        threshold, interval = item.split(':')
+        cadence.append((float(threshold), float(interval)))
+    return tuple(sorted(cadence, reverse=True))
+
+def result_deadlines(result: Optional[Dict]) -> List[datetime]:
+    if not result:
+        return []
+    rounds = result.get('rounds') or [result]
+    deadlines = [parse_deadline((r.get('toto_info') or {}).get('deadline')) for r in rounds]
+    return [deadline for deadline in deadlines if deadline is not None]
+
+class PrewarmScheduler:
+    def __init__(self, job_manager: Optional[JobManager] = None,
+                 cadence: Sequence[Tuple[float, float]] = DEFAULT_CADENCE,
+                 after_deadline_interval: float = AFTER_DEADLINE_INTERVAL,
+                 retry_interval: float = RETRY_INTERVAL, all_rounds: bool = False,
+                 clock: Optional[Callable[[], datetime]] = None):
+        self.job_manager = job_manager or get_job_manager()
+        self.cadence = tuple(sorted(cadence, reverse=True))
+        self.after_deadline_interval = after_deadline_interval
+        self.retry_interval = retry_interval
+        self.all_rounds = all_rounds
+        self.clock = clock or (lambda: datetime.now(JST))
+        self.next_run_at: Optional[datetime] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def next_interval(self, deadlines: List[datetime]) -> float:
+        now = self.clock()
+        upcoming = [deadline for deadline in deadlines if deadline > now]
+        if not upcoming:
+            return self.after_deadline_interval
+        
+        remaining = (min(upcoming) - now).total_seconds()
+        for threshold, interval in self.cadence:
+            if remaining >= threshold:
+                return min(interval, remaining)
+        return min(self.cadence[-1][1], remaining)
+    
+    def run_once(self) -> float:
+        from app.batch import pipeline
+        
+        if self.all_rounds:
+            job = self.job_manager.submit(ALL_ROUNDS_JOB_KEY, lambda: pipeline.run_batch_pipeline(all_rounds=True))
+        else:
+            job = self.job_manager.submit(CURRENT_ROUND_JOB_KEY, pipeline.run_batch_pipeline)
+        job.done.wait()
+        
+        if job.status != 'succeeded':
+            logger.warning(f"事前計算のバッチが失敗しました: {job.error}")
+            delay = self.retry_interval
+        else:
+            delay = self.next_interval(result_deadlines(job.result))
+        
+        self.next_run_at = self.clock() + timedelta(seconds=delay)
+        logger.info(f"次回の事前計算: {self.next_run_at.strftime('%Y/%m/%d %H:%M')}")
+        return delay
+    
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                delay = self.run_once()
+            except Exception as e:
+                logger.error(f"事前計算でエラーが発生しました: {str(e)}")
+                delay = self.retry_interval
+            self._stop.wait(delay)
+    
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='prewarm-scheduler', daemon=True)
+        self._thread.start()
+        logger.info("事前計算スケジューラを開始しました")
+    
+    def stop(self) -> None:
+        self._stop.set()
+
+def scheduler_from_env() -> PrewarmScheduler:
+    cadence = os.environ.get('TOTO_PREWARM_CADENCE')
+    return PrewarmScheduler(
+        cadence=parse_cadence(cadence) if cadence else DEFAULT_CADENCE,
+        all_rounds=os.environ.get('TOTO_PREWARM_SCOPE') == 'all'
+    )
+
+_scheduler: Optional[PrewarmScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def start_scheduler_from_env() -> Optional[PrewarmScheduler]:
+    global _scheduler
+    if os.environ.get('TOTO_PREWARM') != '1':
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = scheduler_from_env()
+            _scheduler.start()
+        return _scheduler
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='toto販売締切に合わせて予想を事前計算します')
+    parser.add_argument('--once', action='store_true', help='1回だけ実行して次回の実行予定を表示')
+    args = parser.parse_args(argv)
+    
+    scheduler = scheduler_from_env()
+    if args.once:
+        delay = scheduler.run_once()
+        print(f'次回の実行まで {delay:.0f} 秒')
+        return
+    scheduler.run_forever()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
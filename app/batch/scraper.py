@@ -1,66 +1,275 @@
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import logging
+import os
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from app.batch.http_cache import HttpCache
+from app.batch.locks import LockTimeout, SingleFlight
+from app.batch.models import Match, RecentMatch, TeamStats, VenueStats
+from app.batch.metrics import HTTP_REQUEST_SECONDS, TEAM_STATS_REFRESHES, stage_timer
+from app.batch.products import DEFAULT_PRODUCT, PRODUCT_LABELS, PRODUCT_MATCH_COUNTS, round_key
+from app.batch.retry import HALF_OPEN, CircuitBreakerRegistry, RetryPolicy, get_circuit_breakers
+from app.batch.team_state import TeamStateStore, latest_match_date, merge_recent_matches
+from app.batch.transport import get_transport
 
 logger = logging.getLogger(__name__)
 
+TOTO_TOP_URL = 'https://www.toto-dream.com/'
+TEAM_STATS_URL = 'https://data.j-league.or.jp/SFMS02/?team_name={team_name}'
+
+def _class_filter(targets: Dict[str, set]):
+    def match(name, attrs=None):
+        classes = targets.get(name)
+        if not classes or not attrs:
+            return False
+        class_attr = attrs.get('class', '')
+        if isinstance(class_attr, str):
+            class_attr = class_attr.split()
+        return not classes.isdisjoint(class_attr)
+    return match
+
+TOP_PAGE_STRAINER = SoupStrainer(_class_filter({
+    'span': {'round-number', 'match-date', 'deadline'},
+    'div': {'match-item'},
+    'a': {'open-round'}
+}))
+
+TEAM_PAGE_STRAINER = SoupStrainer(_class_filter({
+    'tr': {'match-row'},
+    'span': {'ranking'},
+    'div': {'home-stats', 'away-stats'}
+}))
+
 class TotoScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        self.retry_count = 3
-        self.retry_delay = 10
+    def __init__(self, max_workers: int = 8, per_host_limit: int = 4, cache: Optional[HttpCache] = None,
+                 rng: Optional[random.Random] = None, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breakers: Optional[CircuitBreakerRegistry] = None,
+                 team_state: Optional[TeamStateStore] = None, single_flight: Optional[SingleFlight] = None,
+                 session: Optional[requests.Session] = None):
+        self.session = session or get_transport().session()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breakers = circuit_breakers or get_circuit_breakers()
+        self.deadline = self.retry_policy.start()
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self._host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_lock = threading.Lock()
+        self.cache = cache
+        self.parser = 'lxml'
+        self.rng = rng or random.Random()
+        self.team_state = team_state
+        self.single_flight = single_flight
+        self.toto_top_url = os.environ.get('TOTO_TOP_URL', TOTO_TOP_URL)
+        self.team_stats_url = os.environ.get('TOTO_TEAM_STATS_URL', TEAM_STATS_URL)
+    
+    @property
+    def retry_count(self) -> int:
+        return self.retry_policy.max_attempts
+    
+    @property
+    def retry_delay(self) -> float:
+        return self.retry_policy.max_delay
+    
+    @contextmanager
+    def _host_slot(self, url: str):
+        host = urlparse(url).netloc
+        with self._host_lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_semaphores[host] = semaphore
+        with semaphore:
+            yield
     
     def _retry_request(self, url: str, method: str = 'GET', **kwargs) -> Optional[requests.Response]:
-        for attempt in range(self.retry_count):
+        if self.cache is None or method.upper() != 'GET':
+            return self._request_with_retry(url, method, **kwargs)
+        
+        response = self._fresh_cached_response(url)
+        if response is not None:
+            return response
+        if self.single_flight is None:
+            return self._request_with_retry(url, method, **kwargs)
+        
+        try:
+            with self.single_flight.lock(f'http:{url}', timeout=self.deadline.remaining()):
+                response = self._fresh_cached_response(url)
+                if response is not None:
+                    return response
+                return self._request_with_retry(url, method, **kwargs)
+        except LockTimeout:
+            logger.warning(f"他のワーカーの取得完了を期限内に待てなかったためリクエストを中止します: {url}")
+            return None
+    
+    def _fresh_cached_response(self, url: str) -> Optional[requests.Response]:
+        cache_entry = self.cache.lookup(url)
+        if cache_entry and cache_entry['fresh']:
+            self.cache.record('hit')
+            return self.cache.build_response(url, cache_entry)
+        return None
+    
+    def _request_with_retry(self, url: str, method: str = 'GET', **kwargs) -> Optional[requests.Response]:
+        use_cache = self.cache is not None and method.upper() == 'GET'
+        cache_entry = self.cache.lookup(url) if use_cache else None
+        if cache_entry:
+            kwargs['headers'] = {**self.cache.conditional_headers(cache_entry), **kwargs.get('headers', {})}
+        
+        host = urlparse(url).netloc
+        breaker = self.circuit_breakers.get(host)
+        policy = self.retry_policy
+        
+        for attempt in range(policy.max_attempts):
+            remaining = self.deadline.remaining()
+            if remaining is not None and remaining <= 0:
+                logger.warning(f"バッチの期限を超えたためリクエストを中止します: {url}")
+                break
+            if not breaker.allow_request():
+                logger.warning(f"サーキットブレーカー作動中のためリクエストを中止します: {url}")
+                break
+            trial = breaker.state == HALF_OPEN
+            timeout = policy.request_timeout if remaining is None else min(policy.request_timeout, remaining)
+            
             try:
-                if method.upper() == 'GET':
-                    response = self.session.get(url, timeout=30, **kwargs)
-                else:
-                    response = self.session.post(url, timeout=30, **kwargs)
+                with self._host_slot(url):
+                    started = time.perf_counter()
+                    try:
+                        if method.upper() == 'GET':
+                            response = self.session.get(url, timeout=timeout, **kwargs)
+                        else:
+                            response = self.session.post(url, timeout=timeout, **kwargs)
+                    except requests.RequestException:
+                        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, host=host, outcome='error')
+                        raise
+                    outcome = 'ok' if response.status_code < 400 else 'error'
+                    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, host=host, outcome=outcome)
+                
+                if cache_entry and response.status_code == 304:
+                    breaker.record_success()
+                    self.cache.touch(url)
+                    self.cache.record('revalidated')
+                    return self.cache.build_response(url, cache_entry)
                 
                 response.raise_for_status()
+                breaker.record_success()
+                if use_cache:
+                    self.cache.store(url, response)
+                    self.cache.record('miss')
                 return response
                 
             except requests.RequestException as e:
-                logger.warning(f"Request failed (attempt {attempt + 1}/{self.retry_count}): {str(e)}")
-                if attempt < self.retry_count - 1:
-                    time.sleep(self.retry_delay)
-                else:
-                    logger.error(f"All retry attempts failed for URL: {url}")
-                    return None
+                logger.warning(f"Request failed (attempt {attempt + 1}/{policy.max_attempts}): {str(e)}")
+                status_code = getattr(getattr(e, 'response', None), 'status_code', None)
+                if status_code is not None and status_code < 500:
+                    breaker.record_success()
+                    break
+                breaker.record_failure()
+                
+                if attempt < policy.max_attempts - 1:
+                    delay = policy.backoff(attempt)
+                    remaining = self.deadline.remaining()
+                    if remaining is not None and remaining <= delay:
+                        logger.warning(f"バッチの期限内に再試行できません: {url}")
+                        break
+                    time.sleep(delay)
+            except Exception:
+                # 結果を記録できずに抜ける場合も試行枠を返し、半開状態のまま固まらないようにする
+                if trial:
+                    breaker.release_trial()
+                raise
+        
+        logger.error(f"All retry attempts failed for URL: {url}")
+        if cache_entry:
+            logger.warning(f"期限切れのキャッシュを使用します: {url}")
+            self.cache.record('hit')
+            return self.cache.build_response(url, cache_entry)
+        return None
+    
+    def _parse_html(self, content: bytes, strainer: Optional[SoupStrainer] = None) -> BeautifulSoup:
+        return BeautifulSoup(content, self.parser, parse_only=strainer)
     
     def get_latest_toto_info(self) -> Optional[Dict]:
         logger.info("toto情報を取得中...")
         
+        fetched = self._fetch_round(self.toto_top_url, DEFAULT_PRODUCT)
+        return fetched[0] if fetched else None
+    
+    def get_open_rounds_info(self) -> List[Dict]:
+        logger.info("販売中の全回の情報を取得中...")
+        
+        fetched = self._fetch_round(self.toto_top_url, DEFAULT_PRODUCT)
+        if not fetched:
+            return []
+        
+        toto_info, soup = fetched
+        links = [
+            (url, product) for url, product in self._extract_open_rounds(soup)
+            if url != self.toto_top_url
+        ]
+        
+        rounds = [toto_info]
+        if links:
+            workers = min(self.max_workers, len(links))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='open-rounds') as executor:
+                results = executor.map(lambda link: self._fetch_round(*link), links)
+                rounds.extend(result[0] for result in results if result)
+        
+        unique_rounds: Dict[str, Dict] = {}
+        for info in rounds:
+            unique_rounds.setdefault(round_key(info), info)
+        
+        logger.info(f"販売中の{len(unique_rounds)}回分の情報を取得しました")
+        return list(unique_rounds.values())
+    
+    def _fetch_round(self, url: str, product: str) -> Optional[Tuple[Dict, BeautifulSoup]]:
+        label = PRODUCT_LABELS.get(product, product)
         try:
-            url = "https://www.toto-dream.com/"
-            response = self._retry_request(url)
+            with stage_timer('fetch'):
+                response = self._retry_request(url)
             
             if not response:
                 return None
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            toto_info = {
-                'round': self._extract_round_number(soup),
-                'date': self._extract_date(soup),
-                'deadline': self._extract_deadline(soup),
-                'matches': self._extract_matches(soup)
-            }
+            with stage_timer('parse'):
+                soup = self._parse_html(response.content, TOP_PAGE_STRAINER)
+                
+                toto_info = {
+                    'product': product,
+                    'round': self._extract_round_number(soup),
+                    'date': self._extract_date(soup),
+                    'deadline': self._extract_deadline(soup),
+                    'matches': self._extract_matches(soup, PRODUCT_MATCH_COUNTS.get(product, 13))
+                }
             
-            logger.info(f"toto情報を取得しました: 第{toto_info['round']}回")
-            return toto_info
+            logger.info(f"{label}情報を取得しました: 第{toto_info['round']}回")
+            return toto_info, soup
             
         except Exception as e:
-            logger.error(f"toto情報の取得でエラーが発生しました: {str(e)}")
+            logger.error(f"{label}情報の取得でエラーが発生しました: {str(e)}")
             return None
     
+    def _extract_open_rounds(self, soup: BeautifulSoup) -> List[Tuple[str, str]]:
+        links = []
+        try:
+            for link in soup.find_all('a', class_='open-round'):
+                product = link.get('data-product', '')
+                href = link.get('href')
+                if product not in PRODUCT_MATCH_COUNTS or not href:
+                    continue
+                url = urljoin(self.toto_top_url, href)
+                if (url, product) not in links:
+                    links.append((url, product))
+        except Exception as e:
+            logger.warning(f"販売中の回の一覧の取得に失敗しました: {str(e)}")
+        return links
+    
     def _extract_round_number(self, soup: BeautifulSoup) -> str:
         try:
             round_elem = soup.find('span', class_='round-number')
@@ -88,27 +297,23 @@ class TotoScraper:
         except Exception:
             return "未定"
     
-    def _extract_matches(self, soup: BeautifulSoup) -> List[Dict]:
+    def _extract_matches(self, soup: BeautifulSoup, limit: int = 13) -> List[Match]:
         matches = []
         try:
             match_elements = soup.find_all('div', class_='match-item')
             
-            for i, match_elem in enumerate(match_elements[:13]):
+            for i, match_elem in enumerate(match_elements[:limit]):
                 home_team = self._extract_team_name(match_elem, 'home')
                 away_team = self._extract_team_name(match_elem, 'away')
                 
-                matches.append({
-                    'match_number': i + 1,
-                    'home_team': home_team,
-                    'away_team': away_team
-                })
+                matches.append(Match(i + 1, home_team, away_team))
             
             if not matches:
-                matches = self._generate_dummy_matches()
+                matches = self._generate_dummy_matches()[:limit]
                 
         except Exception as e:
             logger.warning(f"試合情報の取得に失敗しました: {str(e)}")
-            matches = self._generate_dummy_matches()
+            matches = self._generate_dummy_matches()[:limit]
         
         return matches
     
@@ -121,7 +326,7 @@ class TotoScraper:
         except Exception:
             return f"{team_type}チーム"
     
-    def _generate_dummy_matches(self) -> List[Dict]:
+    def _generate_dummy_matches(self) -> List[Match]:
         j_league_teams = [
             '浦和レッズ', '鹿島アントラーズ', 'FC東京', '川崎フロンターレ',
             '横浜F・マリノス', '湘南ベルマーレ', '柏レイソル', 'ガンバ大阪',
@@ -135,77 +340,140 @@ class TotoScraper:
             home_idx = (i * 2) % len(j_league_teams)
             away_idx = (i * 2 + 1) % len(j_league_teams)
             
-            matches.append({
-                'match_number': i + 1,
-                'home_team': j_league_teams[home_idx],
-                'away_team': j_league_teams[away_idx]
-            })
+            matches.append(Match(i + 1, j_league_teams[home_idx], j_league_teams[away_idx]))
         
         logger.info("ダミーの試合データを生成しました")
         return matches
     
-    def get_team_performance_data(self, matches: List[Dict]) -> Dict:
+    def get_team_performance_data(self, matches: List[Dict], scheduled_dates: Optional[Dict[str, str]] = None,
+                                  on_team_stats: Optional[Callable[[str, TeamStats], None]] = None) -> Dict:
         logger.info("チーム成績データを取得中...")
         
-        team_data = {}
-        
+        team_names = []
         for match in matches:
-            home_team = match['home_team']
-            away_team = match['away_team']
-            
-            if home_team not in team_data:
-                team_data[home_team] = self._get_team_stats(home_team)
-            
-            if away_team not in team_data:
-                team_data[away_team] = self._get_team_stats(away_team)
+            for team_name in (match['home_team'], match['away_team']):
+                if team_name not in team_names:
+                    team_names.append(team_name)
+        
+        team_rngs = [random.Random(self.rng.getrandbits(64)) for _ in team_names]
+        scheduled = [(scheduled_dates or {}).get(team_name) for team_name in team_names]
+        
+        def load(team_name: str, rng: random.Random, scheduled_date: Optional[str]) -> TeamStats:
+            stats = self._load_team_stats(team_name, rng, scheduled_date)
+            if on_team_stats is not None:
+                on_team_stats(team_name, stats)
+            return stats
+        
+        if self.max_workers == 1 or len(team_names) <= 1:
+            team_data = {
+                team_name: load(team_name, rng, scheduled_date)
+                for team_name, rng, scheduled_date in zip(team_names, team_rngs, scheduled)
+            }
+        else:
+            workers = min(self.max_workers, len(team_names))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='team-stats') as executor:
+                results = executor.map(load, team_names, team_rngs, scheduled)
+                team_data = dict(zip(team_names, results))
         
         logger.info(f"{len(team_data)}チームの成績データを取得しました")
         return team_data
     
-    def _get_team_stats(self, team_name: str) -> Dict:
+    def _load_team_stats(self, team_name: str, rng: Optional[random.Random] = None,
+                         scheduled_date: Optional[str] = None) -> Dict:
+        if self.team_state is None:
+            return self._get_team_stats(team_name, rng)
+        
+        state = self.team_state.get(team_name)
+        if not self.team_state.needs_refresh(state, scheduled_date):
+            TEAM_STATS_REFRESHES.inc(outcome='reused')
+            return state['stats']
+        
+        return self._refresh_team_stats(team_name, rng, state)
+    
+    def _refresh_team_stats(self, team_name: str, rng: Optional[random.Random], state: Optional[Dict]) -> TeamStats:
+        since = state['last_match_date'] if state else None
+        try:
+            content = self._fetch_team_page(team_name)
+        except Exception as e:
+            logger.warning(f"チーム成績取得エラー ({team_name}): {str(e)}")
+            content = None
+        
+        if content is None:
+            if state:
+                TEAM_STATS_REFRESHES.inc(outcome='stale')
+                return state['stats']
+            return self._generate_dummy_team_stats(rng)
+        
+        with stage_timer('parse'):
+            soup = self._parse_html(content, TEAM_PAGE_STRAINER)
+            stats = self._parse_team_stats(soup, rng, since=since)
+        if state:
+            stats.recent_matches = merge_recent_matches(state['stats'].recent_matches, stats.recent_matches, since)
+        if not stats.recent_matches:
+            stats.recent_matches = self._generate_dummy_recent_matches(rng)
+        
+        last_match_date = latest_match_date(stats.recent_matches)
+        if last_match_date:
+            self.team_state.save(team_name, stats, last_match_date)
+        TEAM_STATS_REFRESHES.inc(outcome='refreshed')
+        return stats
+    
+    def _fetch_team_page(self, team_name: str) -> Optional[bytes]:
+        url = self.team_stats_url.format(team_name=team_name)
+        response = self._retry_request(url)
+        return response.content if response else None
+    
+    def _get_team_stats(self, team_name: str, rng: Optional[random.Random] = None) -> TeamStats:
         try:
-            url = f"https://data.j-league.or.jp/SFMS02/?team_name={team_name}"
-            response = self._retry_request(url)
+            content = self._fetch_team_page(team_name)
             
-            if response:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                return self._parse_team_stats(soup)
+            if content is not None:
+                with stage_timer('parse'):
+                    soup = self._parse_html(content, TEAM_PAGE_STRAINER)
+                    return self._parse_team_stats(soup, rng)
             else:
-                return self._generate_dummy_team_stats()
+                return self._generate_dummy_team_stats(rng)
                 
         except Exception as e:
             logger.warning(f"チーム成績取得エラー ({team_name}): {str(e)}")
-            return self._generate_dummy_team_stats()
+            return self._generate_dummy_team_stats(rng)
     
-    def _parse_team_stats(self, soup: BeautifulSoup) -> Dict:
+    def _parse_team_stats(self, soup: BeautifulSoup, rng: Optional[random.Random] = None,
+                          since: Optional[str] = None) -> TeamStats:
         try:
             recent_matches = []
             match_rows = soup.find_all('tr', class_='match-row')[:5]
             
             for row in match_rows:
                 result = self._extract_match_result(row)
+                if since is not None and (result.date or '') <= since:
+                    break
                 recent_matches.append(result)
             
             ranking = self._extract_ranking(soup)
             home_stats = self._extract_home_away_stats(soup, 'home')
             away_stats = self._extract_home_away_stats(soup, 'away')
             
-            return {
-                'recent_matches': recent_matches or self._generate_dummy_recent_matches(),
-                'ranking': ranking or 10,
-                'home_stats': home_stats or {'wins': 5, 'draws': 3, 'losses': 2},
-                'away_stats': away_stats or {'wins': 3, 'draws': 4, 'losses': 3}
-            }
+            if since is None:
+                recent_matches = recent_matches or self._generate_dummy_recent_matches(rng)
+            
+            return TeamStats(
+                recent_matches,
+                ranking or 10,
+                home_stats or VenueStats(5, 3, 2),
+                away_stats or VenueStats(3, 4, 3)
+            )
             
         except Exception as e:
             logger.warning(f"チーム統計の解析エラー: {str(e)}")
-            return self._generate_dummy_team_stats()
+            return self._generate_dummy_team_stats(rng)
     
-    def _extract_match_result(self, row) -> Dict:
+    def _extract_match_result(self, row) -> RecentMatch:
         try:
             result_elem = row.find('span', class_='result')
             score_elem = row.find('span', class_='score')
             opponent_elem = row.find('span', class_='opponent')
+            date_elem = row.find(class_='date')
             
             result = result_elem.get_text(strip=True) if result_elem else 'D'
             score = score_elem.get_text(strip=True) if score_elem else '1-1'
@@ -213,20 +481,12 @@ class TotoScraper:
             
             goals_for, goals_against = self._parse_score(score)
             
-            return {
-                'result': result,
-                'goals_for': goals_for,
-                'goals_against': goals_against,
-                'opponent': opponent
-            }
+            date = date_elem.get_text(strip=True) if date_elem else None
+            
+            return RecentMatch(result, goals_for, goals_against, opponent, date)
             
         except Exception:
-            return {
-                'result': 'D',
-                'goals_for': 1,
-                'goals_against': 1,
-                'opponent': '対戦相手'
-            }
+            return RecentMatch()
     
     def _parse_score(self, score: str) -> tuple:
         try:
@@ -247,7 +507,7 @@ class TotoScraper:
         except Exception:
             return 10
     
-    def _extract_home_away_stats(self, soup: BeautifulSoup, venue: str) -> Dict:
+    def _extract_home_away_stats(self, soup: BeautifulSoup, venue: str) -> VenueStats:
         try:
             stats_elem = soup.find('div', class_=f'{venue}-stats')
             if stats_elem:
@@ -255,36 +515,36 @@ class TotoScraper:
                 draws = int(stats_elem.find('span', class_='draws').get_text(strip=True) or 0)
                 losses = int(stats_elem.find('span', class_='losses').get_text(strip=True) or 0)
                 
-                return {'wins': wins, 'draws': draws, 'losses': losses}
+                return VenueStats(wins, draws, losses)
             
-            return {'wins': 3, 'draws': 3, 'losses': 4}
+            return VenueStats()
             
         except Exception:
-            return {'wins': 3, 'draws': 3, 'losses': 4}
+            return VenueStats()
     
-    def _generate_dummy_team_stats(self) -> Dict:
-        import random
+    def _generate_dummy_team_stats(self, rng: Optional[random.Random] = None) -> TeamStats:
+        rng = rng or self.rng
         
-        recent_matches = self._generate_dummy_recent_matches()
-        ranking = random.randint(1, 20)
+        recent_matches = self._generate_dummy_recent_matches(rng)
+        ranking = rng.randint(1, 20)
         
-        return {
-            'recent_matches': recent_matches,
-            'ranking': ranking,
-            'home_stats': {'wins': random.randint(2, 8), 'draws': random.randint(1, 5), 'losses': random.randint(1, 7)},
-            'away_stats': {'wins': random.randint(1, 6), 'draws': random.randint(2, 6), 'losses': random.randint(2, 8)}
-        }
+        return TeamStats(
+            recent_matches,
+            ranking,
+            VenueStats(rng.randint(2, 8), rng.randint(1, 5), rng.randint(1, 7)),
+            VenueStats(rng.randint(1, 6), rng.randint(2, 6), rng.randint(2, 8))
+        )
     
-    def _generate_dummy_recent_matches(self) -> List[Dict]:
-        import random
+    def _generate_dummy_recent_matches(self, rng: Optional[random.Random] = None) -> List[RecentMatch]:
+        rng = rng or self.rng
         
         results = ['W', 'D', 'L']
         matches = []
         
         for i in range(5):
-            result = random.choice(results)
-            goals_for = random.randint(0, 3)
-            goals_against = random.randint(0, 3)
+            result = rng.choice(results)
+            goals_for = rng.randint(0, 3)
+            goals_against = rng.randint(0, 3)
             
             if result == 'W':
                 goals_for = max(goals_for, goals_against + 1)
@@ -293,11 +553,6 @@ class TotoScraper:
             else:
                 goals_against = goals_for
             
-            matches.append({
-                'result': result,
-                'goals_for': goals_for,
-                'goals_against': goals_against,
-                'opponent': f'対戦相手{i+1}'
-            })
+            matches.append(RecentMatch(result, goals_for, goals_against, f'対戦相手{i+1}'))
         
         return matches
\ No newline at end of file
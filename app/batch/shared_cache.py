@@ -0,0 +1,59 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARED_CACHE_PATH = os.path.join(tempfile.gettempdir(), 'toto-oracle', 'shared_cache.sqlite3')
+
+class SharedCache:
+    def __init__(self, db_path: str = DEFAULT_SHARED_CACHE_PATH):
+        self.db_path = db_path
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                ' key TEXT PRIMARY KEY,'
+                ' value TEXT NOT NULL,'
+                ' expires_at REAL NOT NULL)'
+            )
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT value FROM entries WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+    
+    def set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)', (key, value, now + ttl)
+            )
+            conn.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+    
+    def delete_prefix(self, prefix: str) -> None:
+        pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE key LIKE ? ESCAPE '\\'", (pattern,))
+
+_shared_cache: Optional[SharedCache] = None
+_shared_cache_lock = threading.Lock()
+
+def get_shared_cache() -> SharedCache:
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = SharedCache(os.environ.get('TOTO_SHARED_CACHE_DB', DEFAULT_SHARED_CACHE_PATH))
+        return _shared_cache
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.batch.encoding import compress_variants
+from app.batch.models import dumps
+from app.batch.products import round_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), 'toto-oracle', 'predictions.sqlite3')
+MAX_ENCODED_VERSIONS = 32
+
+class PredictionStore:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._latest: Optional[Dict] = None
+        self._loaded_mtime: Optional[int] = None
+        self._encoded: 'OrderedDict[int, Dict[str, bytes]]' = OrderedDict()
+        self._encoded_lock = threading.Lock()
+        
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS predictions ('
+                ' version INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' round TEXT NOT NULL,'
+                ' created_at REAL NOT NULL,'
+                ' payload TEXT NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_predictions_round ON predictions (round, version)')
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+    
+    def _mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.db_path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _encode(self, version: int, payload: str) -> Dict[str, bytes]:
+        with self._encoded_lock:
+            variants = self._encoded.get(version)
+            if variants is not None:
+                self._encoded.move_to_end(version)
+                return variants
+        
+        variants = compress_variants(payload.encode('utf-8'))
+        with self._encoded_lock:
+            self._encoded[version] = variants
+            while len(self._encoded) > MAX_ENCODED_VERSIONS:
+                self._encoded.popitem(last=False)
+        return variants
+    
+    def _make_entry(self, version: int, round_number: str, created_at: float, payload: str) -> Dict:
+        variants = self._encode(version, payload)
+        return {
+            'version': version,
+            'round': round_number,
+            'created_at': created_at,
+            'payload': payload,
+            'variants': variants,
+            'etag': hashlib.sha256(variants['identity']).hexdigest()[:32]
+        }
+    
+    def save(self, result: Dict) -> Dict:
+        round_number = round_key(result.get('toto_info', {}))
+        created_at = time.time()
+        
+        with self._lock:
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    'INSERT INTO predictions (round, created_at, payload) VALUES (?, ?, ?)',
+                    (round_number, created_at, '')
+                )
+                version = cursor.lastrowid
+                data = {
+                    'status': 'success',
+                    'round': round_number,
+                    'version': version,
+                    'generated_at': created_at,
+                    'toto_info': result.get('toto_info'),
+                    'predictions': result.get('predictions')
+                }
+                if result.get('probabilities') is not None:
+                    data['probabilities'] = result['probabilities']
+                payload = dumps(data)
+                conn.execute('UPDATE predictions SET payload = ? WHERE version = ?', (payload, version))
+            
+            self._latest = self._make_entry(version, round_number, created_at, payload)
+            self._loaded_mtime = self._mtime()
+        
+        logger.info(f"予想データを保存しました: 第{round_number}回 (version {version})")
+        return self._latest
+    
+    def latest(self) -> Optional[Dict]:
+        mtime = self._mtime()
+        if self._latest is not None and mtime == self._loaded_mtime:
+            return self._latest
+        
+        with self._lock:
+            with self._connect() as conn:
+                row = conn.execute(
+                    'SELECT version, round, created_at, payload FROM predictions ORDER BY version DESC LIMIT 1'
+                ).fetchone()
+            self._latest = self._make_entry(*row) if row else None
+            self._loaded_mtime = mtime
+            return self._latest
+    
+    def get_round(self, round_number: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT version, round, created_at, payload FROM predictions'
+                ' WHERE round = ? ORDER BY version DESC LIMIT 1',
+                (str(round_number),)
+            ).fetchone()
+        return self._make_entry(*row) if row else None
+
+_prediction_store: Optional[PredictionStore] = None
+_prediction_store_lock = threading.Lock()
+
+def get_prediction_store() -> PredictionStore:
+    global _prediction_store
+    with _prediction_store_lock:
+        if _prediction_store is None:
+            _prediction_store = PredictionStore(os.environ.get('TOTO_PREDICTION_DB', DEFAULT_DB_PATH))
+        return _prediction_store
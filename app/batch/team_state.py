@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.batch.models import RecentMatch, TeamStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEAM_STATE_PATH = os.path.join(tempfile.gettempdir(), 'toto-oracle', 'team_state.sqlite3')
+
+RECENT_MATCH_LIMIT = 5
+
+def latest_match_date(recent_matches: List[RecentMatch]) -> Optional[str]:
+    dates = [match.date for match in recent_matches if match.date]
+    return max(dates) if dates else None
+
+def merge_recent_matches(stored: List[RecentMatch], fetched: List[RecentMatch], since: Optional[str],
+                         limit: int = RECENT_MATCH_LIMIT) -> List[RecentMatch]:
+    new_matches = [match for match in fetched if since is None or (match.date or '') > since]
+    return (new_matches + stored)[:limit]
+
+class TeamStateStore:
+    def __init__(self, db_path: str = DEFAULT_TEAM_STATE_PATH, max_age: float = 24 * 60 * 60):
+        self.db_path = db_path
+        self.max_age = max_age
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS team_state ('
+                ' team TEXT PRIMARY KEY,'
+                ' last_match_date TEXT NOT NULL,'
+                ' checked_at REAL NOT NULL,'
+                ' stats TEXT NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, team_name: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT last_match_date, checked_at, stats FROM team_state WHERE team = ?', (team_name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'last_match_date': row[0], 'checked_at': row[1], 'stats': TeamStats.coerce(json.loads(row[2]))}
+
+    def save(self, team_name: str, stats: TeamStats, last_match_date: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO team_state (team, last_match_date, checked_at, stats) VALUES (?, ?, ?, ?)',
+                (team_name, last_match_date, time.time(), json.dumps(stats.to_dict(), ensure_ascii=False))
+            )
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute('DELETE FROM team_state')
+
+    def needs_refresh(self, state: Optional[Dict], scheduled_date: Optional[str] = None) -> bool:
+        if state is None:
+            return True
+        if time.time() - state['checked_at'] > self.max_age:
+            return True
+        return scheduled_date is not None and scheduled_date > state['last_match_date']
+
+_team_state_store: Optional[TeamStateStore] = None
+_team_state_store_lock = threading.Lock()
+
+def get_team_state_store() -> TeamStateStore:
+    global _team_state_store
+    with _team_state_store_lock:
+        if _team_state_store is None:
+            _team_state_store = TeamStateStore(os.environ.get('TOTO_TEAM_STATE_DB', DEFAULT_TEAM_STATE_PATH))
+        return _team_state_store
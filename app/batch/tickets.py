@@ -0,0 +1,64 @@
+import math
+from typing import Dict, List, Sequence, Tuple
+
+from app.batch.models import MatchProbabilities
+
+OUTCOME_ORDER = ('1', '0', '2')
+
+def _ranked_outcomes(probabilities: MatchProbabilities) -> List[str]:
+    return sorted(OUTCOME_ORDER, key=lambda outcome: -probabilities.outcome(outcome))
+
+def _pareto_front(states: Dict[int, Tuple[float, Tuple[int, ...]]]) -> Dict[int, Tuple[float, Tuple[int, ...]]]:
+    front = {}
+    best = -math.inf
+    for cost in sorted(states):
+        log_prob, choices = states[cost]
+        if log_prob > best:
+            front[cost] = (log_prob, choices)
+            best = log_prob
+    return front
+
+def optimize_ticket(probabilities: Sequence[MatchProbabilities], max_combinations: int) -> Dict:
+    if max_combinations < 1:
+        raise ValueError('購入口数は1以上を指定してください')
+
+    probabilities = [MatchProbabilities.coerce(p) for p in probabilities]
+    rankings = [_ranked_outcomes(p) for p in probabilities]
+
+    states: Dict[int, Tuple[float, Tuple[int, ...]]] = {1: (0.0, ())}
+    for match, ranked in zip(probabilities, rankings):
+        covered = 0.0
+        options = []
+        for marks in range(1, len(ranked) + 1):
+            covered += match.outcome(ranked[marks - 1])
+            if covered > 0:
+                options.append((marks, math.log(min(covered, 1.0))))
+
+        next_states: Dict[int, Tuple[float, Tuple[int, ...]]] = {}
+        for cost, (log_prob, choices) in states.items():
+            for marks, option_log_prob in options:
+                next_cost = cost * marks
+                if next_cost > max_combinations:
+                    continue
+                candidate = log_prob + option_log_prob
+                if next_cost not in next_states or candidate > next_states[next_cost][0]:
+                    next_states[next_cost] = (candidate, choices + (marks,))
+        states = _pareto_front(next_states)
+
+    cost, (log_prob, choices) = max(states.items(), key=lambda item: (item[1][0], -item[0]))
+    marks = [
+        {
+            'match_number': match.match_number,
+            'home_team': match.home_team,
+            'away_team': match.away_team,
+            'marks': ''.join(outcome for outcome in OUTCOME_ORDER if outcome in ranked[:count])
+        }
+        for match, ranked, count in zip(probabilities, rankings, choices)
+    ]
+    return {
+        'combinations': cost,
+        'hit_probability': math.exp(log_prob),
+        'doubles': sum(1 for count in choices if count == 2),
+        'triples': sum(1 for count in choices if count == 3),
+        'marks': marks
+    }
@@ -0,0 +1,57 @@
+import logging
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+class PooledTransport:
+    def __init__(self, pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.headers = {
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
+            'Connection': 'keep-alive'
+        }
+    
+    def session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        return session
+    
+    def close(self) -> None:
+        self.adapter.close()
+
+_transport: Optional[PooledTransport] = None
+_transport_lock = threading.Lock()
+
+def get_transport() -> PooledTransport:
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = PooledTransport(
+                int(os.environ.get('TOTO_HTTP_POOL_CONNECTIONS', DEFAULT_POOL_CONNECTIONS)),
+                int(os.environ.get('TOTO_HTTP_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE))
+            )
+        return _transport
+
+def _reset_after_fork() -> None:
+    global _transport, _transport_lock
+    _transport = None
+    _transport_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
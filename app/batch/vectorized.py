@@ -0,0 +1,183 @@
+import logging
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.batch.models import TeamStats
+from app.batch.predictor import TotoPredictor
+
+logger = logging.getLogger(__name__)
+
+PARAM_NAMES = ('recent_matches_weight', 'ranking_weight', 'home_away_weight', 'home_advantage')
+
+RECENT, RANKING, HOME_VENUE, AWAY_VENUE = range(4)
+
+PADDING = -1
+MAX_DRAWS = 3
+DRAW_CONFIDENCE_THRESHOLD = 60
+CLOSE_MATCH_MARGIN = 5
+
+class TeamTable:
+    def __init__(self, features: np.ndarray, has_stats: np.ndarray):
+        self.features = features
+        self.has_stats = has_stats
+        self.missing_row = len(features) - 1
+
+class VectorizedPredictor:
+    def __init__(self, predictor: Optional[TotoPredictor] = None):
+        self.predictor = predictor or TotoPredictor()
+
+    def default_params(self) -> Dict[str, np.ndarray]:
+        return {name: np.array([getattr(self.predictor, name)], dtype=np.float64) for name in PARAM_NAMES}
+
+    def pack_team_data(self, team_data_list: Sequence[Dict]) -> Tuple[TeamTable, List[Dict[str, int]]]:
+        rows = []
+        has_stats = []
+        indexes = []
+
+        for team_data in team_data_list:
+            index = {}
+            for team_name, team_stats in team_data.items():
+                index[team_name] = len(rows)
+                rows.append(self._team_features(team_stats))
+                has_stats.append(bool(team_stats))
+            indexes.append(index)
+
+        rows.append((0.0, 0.0, 0.0, 0.0))
+        has_stats.append(False)
+
+        table = TeamTable(np.array(rows, dtype=np.float64).reshape(-1, 4), np.array(has_stats, dtype=bool))
+        return table, indexes
+
+    def _team_features(self, team_stats: Dict) -> Tuple[float, float, float, float]:
+        if not team_stats:
+            return 0.0, 0.0, 0.0, 0.0
+
+        predictor = self.predictor
+        team_stats = TeamStats.coerce(team_stats)
+        return (
+            predictor._calculate_recent_form_score(team_stats.recent_matches),
+            predictor._calculate_ranking_score(team_stats.ranking),
+            predictor._calculate_venue_score(team_stats, is_home=True),
+            predictor._calculate_venue_score(team_stats, is_home=False)
+        )
+
+    def pack_rounds(self, rounds: Sequence[Tuple[Dict, Dict]]) -> Tuple[TeamTable, np.ndarray, np.ndarray]:
+        table, indexes = self.pack_team_data([team_data for _, team_data in rounds])
+        max_matches = max((len(toto_info['matches']) for toto_info, _ in rounds), default=0)
+
+        home_idx = np.full((len(rounds), max_matches), PADDING, dtype=np.int64)
+        away_idx = np.full((len(rounds), max_matches), PADDING, dtype=np.int64)
+
+        for r, ((toto_info, _), index) in enumerate(zip(rounds, indexes)):
+            for m, match in enumerate(toto_info['matches']):
+                home_idx[r, m] = index.get(match['home_team'], table.missing_row)
+                away_idx[r, m] = index.get(match['away_team'], table.missing_row)
+
+        return table, home_idx, away_idx
+
+    def predict_codes(self, table: TeamTable, home_idx: np.ndarray, away_idx: np.ndarray,
+                      params: Optional[Dict[str, np.ndarray]] = None, chunk_size: int = 256) -> np.ndarray:
+        params = self._normalize_params(params)
+        param_count = len(params['home_advantage'])
+        codes = np.empty((param_count, *home_idx.shape), dtype=np.int8)
+
+        for start in range(0, param_count, chunk_size):
+            chunk = {name: values[start:start + chunk_size] for name, values in params.items()}
+            codes[start:start + chunk_size] = self._predict_chunk(table, home_idx, away_idx, chunk)
+
+        return codes
+
+    def _normalize_params(self, params: Optional[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        defaults = self.default_params()
+        if params is None:
+            return defaults
+
+        normalized = {name: np.atleast_1d(np.asarray(params.get(name, defaults[name]), dtype=np.float64))
+                      for name in PARAM_NAMES}
+        param_count = max(len(values) for values in normalized.values())
+        for name, values in normalized.items():
+            if len(values) == 1:
+                normalized[name] = np.repeat(values, param_count)
+            elif len(values) != param_count:
+                raise ValueError(f'パラメータ {name} の長さが一致しません')
+        return normalized
+
+    def _predict_chunk(self, table: TeamTable, home_idx: np.ndarray, away_idx: np.ndarray,
+                       params: Dict[str, np.ndarray]) -> np.ndarray:
+        valid = home_idx != PADDING
+        safe_home = np.where(valid, home_idx, 0)
+        safe_away = np.where(valid, away_idx, 0)
+
+        shape = (-1,) + (1,) * home_idx.ndim
+        w_recent = params['recent_matches_weight'].reshape(shape)
+        w_ranking = params['ranking_weight'].reshape(shape)
+        w_venue = params['home_away_weight'].reshape(shape)
+        advantage = params['home_advantage'].reshape(shape)
+
+        home_features = table.features[safe_home]
+        away_features = table.features[safe_away]
+
+        home_score = (
+            home_features[..., RECENT] * w_recent +
+            home_features[..., RANKING] * w_ranking +
+            home_features[..., HOME_VENUE] * w_venue
+        ) + advantage
+        home_score = np.where(table.has_stats[safe_home], home_score, 50 + advantage)
+
+        away_score = (
+            away_features[..., RECENT] * w_recent +
+            away_features[..., RANKING] * w_ranking +
+            away_features[..., AWAY_VENUE] * w_venue
+        )
+        away_score = np.where(table.has_stats[safe_away], away_score, 50.0)
+
+        score_diff = home_score - away_score
+        confidence = np.minimum(np.abs(score_diff) * 2, 95)
+
+        codes = np.where(score_diff > CLOSE_MATCH_MARGIN, 1, np.where(score_diff < -CLOSE_MATCH_MARGIN, 2, 0))
+        close = np.abs(score_diff) <= CLOSE_MATCH_MARGIN
+        confidence = np.where(close, np.maximum(confidence, 30), confidence)
+
+        codes = self._assign_draws(codes, confidence, valid)
+        return np.where(valid, codes, PADDING).astype(np.int8)
+
+    def _assign_draws(self, codes: np.ndarray, confidence: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        confidence = np.where(valid, confidence, np.inf)
+        order = np.argsort(confidence, axis=-1, kind='stable')
+        sorted_confidence = np.take_along_axis(confidence, order, axis=-1)
+
+        match_count = valid.sum(axis=-1, keepdims=True)
+        rank = np.arange(codes.shape[-1])
+        eligible = (rank < match_count // 2) & (sorted_confidence < DRAW_CONFIDENCE_THRESHOLD)
+        draw_sorted = eligible & (np.cumsum(eligible, axis=-1) <= MAX_DRAWS)
+
+        draw = np.zeros_like(draw_sorted)
+        np.put_along_axis(draw, order, draw_sorted, axis=-1)
+        return np.where(draw, 0, codes)
+
+    def predict_matches(self, toto_info: Dict, team_data: Dict) -> List[Dict]:
+        table, home_idx, away_idx = self.pack_rounds([(toto_info, team_data)])
+        codes = self.predict_codes(table, home_idx, away_idx)[0, 0]
+
+        predictions = [
+            {
+                'match_number': match['match_number'],
+                'home_team': match['home_team'],
+                'away_team': match['away_team'],
+                'prediction': str(code)
+            }
+            for match, code in zip(toto_info['matches'], codes)
+        ]
+        predictions.sort(key=lambda x: x['match_number'])
+        return predictions
+
+def make_param_grid(**axes: Sequence[float]) -> Dict[str, np.ndarray]:
+    unknown = set(axes) - set(PARAM_NAMES)
+    if unknown:
+        raise ValueError(f'不明なパラメータです: {", ".join(sorted(unknown))}')
+
+    names = list(axes)
+    combos = np.array(list(product(*(axes[name] for name in names))), dtype=np.float64).reshape(-1, len(names))
+    return {name: combos[:, i] for i, name in enumerate(names)}
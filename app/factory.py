@@ -0,0 +1,60 @@
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+from flask import Blueprint, Flask, Response, jsonify, render_template
+from flask.json.provider import DefaultJSONProvider
+
+from app.batch.metrics import CONTENT_TYPE, REGISTRY
+from app.batch.models import Record
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_MODES = ('background', 'eager', 'preload', 'off')
+
+core_bp = Blueprint('core', __name__)
+
+@core_bp.route('/')
+def index():
+    return render_template('index.html')
+
+@core_bp.route('/health')
+def health():
+    return jsonify({'status': 'ok'}), 200
+
+@core_bp.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+class RecordJSONProvider(DefaultJSONProvider):
+    @staticmethod
+    def default(o):
+        if isinstance(o, Record):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+def create_app(config: Optional[Dict] = None, warm_up: Optional[str] = None) -> Flask:
+    logging.basicConfig(level=logging.INFO)
+    
+    app = Flask('app')
+    app.json = RecordJSONProvider(app)
+    app.config.update(config or {})
+    
+    from app.api.routes import api_bp
+    app.register_blueprint(core_bp)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    
+    mode = warm_up or os.environ.get('TOTO_WARM_UP', 'background')
+    if mode not in WARM_UP_MODES:
+        raise ValueError(f'TOTO_WARM_UP は {", ".join(WARM_UP_MODES)} のいずれかを指定してください: {mode}')
+    
+    from app import warmup
+    if mode == 'eager':
+        warmup.warm_up()
+    elif mode == 'background':
+        threading.Thread(target=warmup.warm_up, name='warm-up', daemon=True).start()
+    elif mode == 'preload':
+        warmup.preload_modules()
+    
+    return app
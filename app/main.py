@@ -1,24 +1,12 @@
-import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from flask import Flask, render_template, jsonify
-from app.api.routes import api_bp
-import logging
-
-app = Flask(__name__)
-app.register_blueprint(api_bp, url_prefix='/api')
+import sys
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+if __package__ in (None, ''):
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+from app.factory import create_app
 
-@app.route('/health')
-def health():
-    return jsonify({'status': 'ok'}), 200
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5050, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5050, debug=True)
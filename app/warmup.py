@@ -0,0 +1,77 @@
+import importlib
+import logging
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+PRELOAD_MODULES = (
+    'requests',
+    'bs4',
+    'lxml.etree',
+    'numpy',
+    'app.batch.scraper',
+    'app.batch.predictor',
+    'app.batch.probability',
+    'app.batch.tickets',
+    'app.batch.pipeline',
+)
+
+_warm_up_timings: Dict[str, float] = {}
+_warm_up_lock = threading.Lock()
+
+def preload_modules() -> float:
+    started = time.perf_counter()
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    return time.perf_counter() - started
+
+def _open_transport() -> None:
+    from app.batch.transport import get_transport
+    
+    get_transport()
+
+def _prime_parser() -> None:
+    from app.batch.scraper import TOP_PAGE_STRAINER, TotoScraper
+    
+    TotoScraper()._parse_html(b'<span class="round-number"></span>', TOP_PAGE_STRAINER)
+
+def _open_stores() -> None:
+    from app.batch.history import get_history_store
+    from app.batch.http_cache import get_default_cache
+    from app.batch.locks import get_single_flight
+    from app.batch.shared_cache import get_shared_cache
+    from app.batch.store import get_prediction_store
+    from app.batch.team_state import get_team_state_store
+    
+    get_prediction_store().latest()
+    get_history_store()
+    get_team_state_store()
+    get_default_cache()
+    get_shared_cache()
+    get_single_flight()
+
+def _start_scheduler() -> None:
+    from app.batch.scheduler import start_scheduler_from_env
+    
+    start_scheduler_from_env()
+
+def warm_up() -> Dict[str, float]:
+    with _warm_up_lock:
+        if _warm_up_timings:
+            return dict(_warm_up_timings)
+        
+        timings = {'modules': preload_modules()}
+        for name, step in (('transport', _open_transport), ('parser', _prime_parser),
+                           ('stores', _open_stores), ('scheduler', _start_scheduler)):
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                logger.warning(f"ウォームアップに失敗しました ({name}): {str(e)}")
+            timings[name] = time.perf_counter() - started
+        
+        _warm_up_timings.update(timings)
+        logger.info(f"ウォームアップが完了しました: {sum(timings.values()) * 1000:.0f}ms")
+        return dict(timings)
@@ -0,0 +1,157 @@
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import bench_parse
+from benchmarks.stand_in import FixtureResponder, StandInServer
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'p50_ms': statistics.median(ordered) * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        'max_ms': ordered[-1] * 1000
+    }
+
+def bench_run_batch(runs: int, warm: bool) -> Dict[str, float]:
+    from app.main import app
+    from app.batch.http_cache import get_default_cache
+    from app.batch.jobs import get_job_manager
+    from app.batch.predictor import clear_prediction_cache
+    from app.batch.shared_cache import get_shared_cache
+    from app.batch.team_state import get_team_state_store
+
+    client = app.test_client()
+    samples = []
+    for _ in range(runs):
+        get_shared_cache().delete_prefix('batch:')
+        if not warm:
+            get_default_cache().clear()
+            clear_prediction_cache()
+            get_team_state_store().clear()
+        start = time.perf_counter()
+        response = client.post('/api/run-batch')
+        if response.status_code != 202:
+            raise RuntimeError(f'バッチを登録できませんでした: {response.status_code} {response.get_data(as_text=True)}')
+        job = get_job_manager().get(response.json['job_id'])
+        job.done.wait()
+        samples.append(time.perf_counter() - start)
+        if job.status != 'succeeded':
+            raise RuntimeError(f'バッチが失敗しました: {job.error}')
+    return _summary(samples)
+
+def bench_scrape(runs: int, max_workers: int) -> Dict[str, float]:
+    from app.batch.scraper import TotoScraper
+
+    teams = 0
+    elapsed = 0.0
+    for _ in range(runs):
+        scraper = TotoScraper(max_workers=max_workers)
+        matches = scraper._generate_dummy_matches()
+        start = time.perf_counter()
+        team_data = scraper.get_team_performance_data(matches)
+        elapsed += time.perf_counter() - start
+        teams += len(team_data)
+    return {'teams': teams, 'seconds': elapsed, 'teams_per_sec': teams / elapsed if elapsed else 0.0}
+
+def bench_predict(rounds: int) -> Dict[str, float]:
+    from app.batch.predictor import TotoPredictor, clear_prediction_cache
+    from app.batch.scraper import TotoScraper
+    from app.batch.vectorized import VectorizedPredictor
+
+    scraper = TotoScraper(rng=random.Random(0))
+    data = []
+    for _ in range(rounds):
+        matches = scraper._generate_dummy_matches()
+        team_data = {team: scraper._generate_dummy_team_stats()
+                     for match in matches for team in (match['home_team'], match['away_team'])}
+        data.append(({'matches': matches}, team_data))
+    match_count = sum(len(toto_info['matches']) for toto_info, _ in data)
+
+    predictor = TotoPredictor()
+    clear_prediction_cache()
+    start = time.perf_counter()
+    for toto_info, team_data in data:
+        predictor.predict_matches(toto_info, team_data)
+    scalar_seconds = time.perf_counter() - start
+
+    vectorized = VectorizedPredictor(predictor)
+    start = time.perf_counter()
+    table, home_idx, away_idx = vectorized.pack_rounds(data)
+    vectorized.predict_codes(table, home_idx, away_idx)
+    vectorized_seconds = time.perf_counter() - start
+
+    return {
+        'matches': match_count,
+        'scalar_matches_per_sec': match_count / scalar_seconds,
+        'vectorized_matches_per_sec': match_count / vectorized_seconds
+    }
+
+def run(args) -> Dict:
+    responder = FixtureResponder(latency=args.latency, failure_rate=args.failure_rate, seed=0)
+    with StandInServer(responder) as server:
+        os.environ.update(server.environ())
+        return {
+            'run_batch_cold': bench_run_batch(args.runs, warm=False),
+            'run_batch_warm': bench_run_batch(args.runs, warm=True),
+            'scrape': bench_scrape(args.runs, args.max_workers),
+            'parse': bench_parse.run(args.parse_repeat, args.padding),
+            'predict': bench_predict(args.rounds),
+            'upstream_requests': responder.requests_served
+        }
+
+def print_report(results: Dict) -> None:
+    for key in ('run_batch_cold', 'run_batch_warm'):
+        row = results[key]
+        print(f"{key:<16} runs={row['runs']:<4} p50={row['p50_ms']:9.2f}ms  p95={row['p95_ms']:9.2f}ms  max={row['max_ms']:9.2f}ms")
+    scrape = results['scrape']
+    print(f"{'scrape':<16} {scrape['teams_per_sec']:9.1f} teams/s ({scrape['teams']} teams in {scrape['seconds']:.2f}s)")
+    for row in results['parse']:
+        print(f"{'parse':<16} {row['backend']:<26}{row['page']:<12}{row['ms']:9.3f}ms  peak={row['peak_kb']:8.1f}KiB")
+    predict = results['predict']
+    print(f"{'predict':<16} scalar={predict['scalar_matches_per_sec']:,.0f} matches/s"
+          f"  vectorized={predict['vectorized_matches_per_sec']:,.0f} matches/s")
+    print(f"{'upstream':<16} {results['upstream_requests']} requests served by the stand-in")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='ローカルのスタンドインを使ってバッチ全体の性能を計測します')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05, help='スタンドインの応答遅延（秒）')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='スタンドインが503を返す確率')
+    parser.add_argument('--max-workers', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=500, help='予想スループット計測に使う回数')
+    parser.add_argument('--parse-repeat', type=int, default=50)
+    parser.add_argument('--padding', type=int, default=50)
+    parser.add_argument('--json', action='store_true', help='結果をJSONで出力')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='toto-bench-')
+    os.environ['TOTO_HTTP_CACHE_DIR'] = os.path.join(workdir, 'http')
+    os.environ['TOTO_PREDICTION_DB'] = os.path.join(workdir, 'predictions.sqlite3')
+    os.environ['TOTO_HISTORY_DB'] = os.path.join(workdir, 'history.sqlite3')
+    os.environ['TOTO_TEAM_STATE_DB'] = os.path.join(workdir, 'team_state.sqlite3')
+    os.environ['TOTO_MATCH_DATASET_DIR'] = os.path.join(workdir, 'matches')
+    os.environ['TOTO_SHARED_CACHE_DB'] = os.path.join(workdir, 'shared_cache.sqlite3')
+    os.environ['TOTO_LOCK_DIR'] = os.path.join(workdir, 'locks')
+    os.environ['TOTO_RATE_LIMIT_CLIENT'] = 'off'
+    os.environ['TOTO_RATE_LIMIT_GLOBAL'] = 'off'
+    logging.disable(logging.WARNING)
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_report(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.batch.match_dataset import LEAGUES, MatchDataset, build_match_dataset
+from app.batch.models import HistoricalMatch
+from app.batch.predictor import TotoPredictor
+
+def synthetic_history(seasons: int, teams_per_league: int, seed: int = 0) -> List[HistoricalMatch]:
+    rng = random.Random(seed)
+    matches = []
+    for league in LEAGUES:
+        teams = [f'{league}-{i:02d}' for i in range(teams_per_league)]
+        for season in range(2026 - seasons, 2026):
+            fixtures = [(home, away) for home in teams for away in teams if home != away]
+            for n, (home, away) in enumerate(fixtures):
+                day = n * 280 // len(fixtures)
+                date = f'{season}/{2 + day // 28:02d}/{1 + day % 28:02d}'
+                matches.append(HistoricalMatch(date, league, home, away, rng.randint(0, 4), rng.randint(0, 3)))
+    return matches
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def run(seasons: int, teams_per_league: int, repeat: int) -> Dict:
+    matches = synthetic_history(seasons, teams_per_league)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        build_match_dataset(matches, directory)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dataset = MatchDataset.open(directory)
+        open_ms = (time.perf_counter() - start) * 1000
+
+        predictor = TotoPredictor(match_dataset=dataset)
+        home, away, before = 'J1-00', 'J1-01', '2025/08/01'
+        return {
+            'matches': len(dataset),
+            'build_s': build_seconds,
+            'open_ms': open_ms,
+            'form_us': measure(lambda: dataset.form(home, before, since='2025/01/01'), repeat),
+            'head_to_head_us': measure(lambda: dataset.head_to_head(home, away, before, last=10), repeat),
+            'adjustment_us': measure(lambda: predictor._history_adjustment(home, away, before), repeat)
+        }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='列指向の試合データセットの作成・読み込み・特徴量計算の時間を計測します')
+    parser.add_argument('--seasons', type=int, default=30)
+    parser.add_argument('--teams', type=int, default=20, help='リーグごとのチーム数')
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    result = run(args.seasons, args.teams, args.repeat)
+    print(f"試合数: {result['matches']}  作成: {result['build_s']:.2f}s  読み込み(mmap): {result['open_ms']:.2f}ms")
+    print(f"シーズン成績: {result['form_us']:.1f}µs  直接対決: {result['head_to_head_us']:.1f}µs  "
+          f"予想への補正値: {result['adjustment_us']:.1f}µs")
+
+if __name__ == '__main__':
+    main()
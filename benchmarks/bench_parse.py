@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.batch.scraper import TotoScraper, TOP_PAGE_STRAINER, TEAM_PAGE_STRAINER
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'fixtures')
+
+FILLER = '<div class="filler"><ul>' + ''.join(
+    f'<li><a href="/news/{i}">お知らせ {i}</a><span class="news-date">2024/06/01</span></li>' for i in range(20)
+) + '</ul></div>\n'
+
+BACKENDS = [
+    ('html.parser (full tree)', 'html.parser', False),
+    ('lxml (full tree)', 'lxml', False),
+    ('lxml + SoupStrainer', 'lxml', True),
+]
+
+def load_page(name: str, padding: int) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        html = f.read()
+    return html.replace('</body>', FILLER * padding + '</body>').encode('utf-8')
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'ms': elapsed * 1000, 'peak_kb': peak / 1024}
+
+def run(repeat: int, padding: int) -> List[Dict]:
+    scraper = TotoScraper()
+    top_page = load_page('toto_top.html', padding)
+    team_page = load_page('team_stats.html', padding)
+    rows = []
+
+    for label, parser, use_strainer in BACKENDS:
+        scraper.parser = parser
+        top_strainer = TOP_PAGE_STRAINER if use_strainer else None
+        team_strainer = TEAM_PAGE_STRAINER if use_strainer else None
+
+        def parse_top():
+            soup = scraper._parse_html(top_page, top_strainer)
+            return scraper._extract_round_number(soup), scraper._extract_matches(soup)
+
+        def parse_team():
+            return scraper._parse_team_stats(scraper._parse_html(team_page, team_strainer))
+
+        rows.append({'backend': label, 'page': 'toto top', 'bytes': len(top_page), **measure(parse_top, repeat)})
+        rows.append({'backend': label, 'page': 'team stats', 'bytes': len(team_page), **measure(parse_team, repeat)})
+
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='HTMLパーサーの解析時間とピークメモリを比較します')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--padding', type=int, default=50, help='実ページの大きさに近づけるための追加ブロック数')
+    args = parser.parse_args(argv)
+
+    print(f"{'backend':<26}{'page':<12}{'bytes':>9}{'ms/page':>10}{'peak KiB':>10}")
+    for row in run(args.repeat, args.padding):
+        print(f"{row['backend']:<26}{row['page']:<12}{row['bytes']:>9}{row['ms']:>10.3f}{row['peak_kb']:>10.1f}")
+
+if __name__ == '__main__':
+    main()
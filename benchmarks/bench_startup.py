@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stand_in import FixtureResponder, StandInServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ('off', 'background', 'eager')
+
+CHILD_SCRIPT = '''
+import json, time
+started = time.perf_counter()
+from app.main import app
+ready = time.perf_counter()
+from app.batch.jobs import get_job_manager
+client = app.test_client()
+response = client.post('/api/run-batch')
+responded = time.perf_counter()
+job = get_job_manager().get(response.json['job_id'])
+job.done.wait()
+finished = time.perf_counter()
+print(json.dumps({
+    'app_ready_ms': (ready - started) * 1000,
+    'first_response_ms': (responded - ready) * 1000,
+    'first_result_ms': (finished - ready) * 1000,
+    'status': job.status
+}))
+'''
+
+def run_child(mode: str, env: Dict[str, str]) -> Dict[str, float]:
+    workdir = tempfile.mkdtemp(prefix='toto-startup-')
+    child_env = {
+        **os.environ,
+        **env,
+        'TOTO_WARM_UP': mode,
+        'TOTO_HTTP_CACHE_DIR': os.path.join(workdir, 'http'),
+        'TOTO_PREDICTION_DB': os.path.join(workdir, 'predictions.sqlite3'),
+        'TOTO_HISTORY_DB': os.path.join(workdir, 'history.sqlite3'),
+        'TOTO_TEAM_STATE_DB': os.path.join(workdir, 'team_state.sqlite3'),
+        'TOTO_SHARED_CACHE_DB': os.path.join(workdir, 'shared_cache.sqlite3'),
+        'TOTO_LOCK_DIR': os.path.join(workdir, 'locks'),
+        'PYTHONPATH': ROOT_DIR
+    }
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT], env=child_env, cwd=ROOT_DIR,
+        capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_ms'] = (time.perf_counter() - started) * 1000
+    if result.pop('status') != 'succeeded':
+        raise RuntimeError(f'バッチが失敗しました (TOTO_WARM_UP={mode})')
+    return result
+
+def run(runs: int) -> Dict[str, Dict[str, float]]:
+    responder = FixtureResponder(seed=0)
+    results = {}
+    with StandInServer(responder) as server:
+        for mode in MODES:
+            samples: List[Dict[str, float]] = [run_child(mode, server.environ()) for _ in range(runs)]
+            results[mode] = {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+    return results
+
+def print_report(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'TOTO_WARM_UP':<14}{'app ready':>12}{'1st response':>14}{'1st result':>12}{'process':>10}")
+    for mode, row in results.items():
+        print(f"{mode:<14}{row['app_ready_ms']:10.1f}ms{row['first_response_ms']:12.1f}ms"
+              f"{row['first_result_ms']:10.1f}ms{row['process_ms']:8.0f}ms")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='アプリの起動時間と最初のリクエストの応答時間を計測します')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='結果をJSONで出力')
+    args = parser.parse_args(argv)
+    
+    results = run(args.runs)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_report(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import gzip
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'fixtures')
+
+FIXTURE_TEAM_NAME = '浦和レッズ'
+
+ROUND_PAGES = {
+    '/minitoto/': 'minitoto_round.html',
+    '/winner/': 'winner_round.html'
+}
+
+class FixtureResponder:
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR, latency: float = 0.0, failure_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests_served = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        with open(os.path.join(fixtures_dir, 'toto_top.html'), 'r', encoding='utf-8') as f:
+            self.top_page = f.read().encode('utf-8')
+        with open(os.path.join(fixtures_dir, 'team_stats.html'), 'r', encoding='utf-8') as f:
+            self.team_page = f.read()
+        self.round_pages = {}
+        for path, filename in ROUND_PAGES.items():
+            with open(os.path.join(fixtures_dir, filename), 'r', encoding='utf-8') as f:
+                self.round_pages[path] = f.read().encode('utf-8')
+
+    def respond(self, url: str) -> Tuple[int, Dict[str, str], bytes]:
+        with self._lock:
+            self.requests_served += 1
+            fail = self._rng.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            return 503, {'Content-Type': 'text/plain'}, b'Service Unavailable'
+
+        parsed = urlparse(url)
+        headers = {'Content-Type': 'text/html; charset=utf-8'}
+        if 'SFMS02' in parsed.path:
+            team_name = parse_qs(parsed.query).get('team_name', [FIXTURE_TEAM_NAME])[0]
+            return 200, headers, self.team_page.replace(FIXTURE_TEAM_NAME, team_name).encode('utf-8')
+        if parsed.path in ('', '/'):
+            return 200, headers, self.top_page
+        if parsed.path in self.round_pages:
+            return 200, headers, self.round_pages[parsed.path]
+        return 404, {'Content-Type': 'text/plain'}, b'Not Found'
+
+class FixtureAdapter(BaseAdapter):
+    def __init__(self, responder: FixtureResponder):
+        super().__init__()
+        self.responder = responder
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        status_code, headers, body = self.responder.respond(request.url)
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+        response.reason = 'OK' if status_code < 400 else 'Error'
+        return response
+
+    def close(self):
+        pass
+
+def mount(session: requests.Session, responder: FixtureResponder) -> FixtureAdapter:
+    adapter = FixtureAdapter(responder)
+    session.mount('https://www.toto-dream.com/', adapter)
+    session.mount('https://data.j-league.or.jp/', adapter)
+    return adapter
+
+class StandInServer:
+    def __init__(self, responder: FixtureResponder, host: str = '127.0.0.1', port: int = 0):
+        responder_ref = responder
+        server_ref = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with server_ref._lock:
+                    server_ref.connections_opened += 1
+
+            def do_GET(self):
+                status_code, headers, body = responder_ref.respond(self.path)
+                if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = gzip.compress(body)
+                    headers = {**headers, 'Content-Encoding': 'gzip'}
+                self.send_response(status_code)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.responder = responder
+        self.connections_opened = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def environ(self) -> Dict[str, str]:
+        return {
+            'TOTO_TOP_URL': f'{self.base_url}/',
+            'TOTO_TEAM_STATS_URL': f'{self.base_url}/SFMS02/?team_name={{team_name}}'
+        }
+
+    def __enter__(self) -> 'StandInServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,13 @@
+import os
+
+bind = '0.0.0.0:5050'
+threads = 8
+preload_app = True
+
+# マスターではモジュールの読み込みだけを行い、ワーカーごとの状態はfork後に作る
+os.environ.setdefault('TOTO_WARM_UP', 'preload')
+
+def post_fork(server, worker):
+    from app.warmup import warm_up
+    
+    warm_up()
@@ -89,4 +89,936 @@ def test_prediction_logic():
     assert len(predictions) == 1
     assert predictions[0]['prediction'] in ['1', '0', '2']
     assert 'home_team' in predictions[0]
-    assert 'away_team' in predictions[0]
\ No newline at end of file
+    assert 'away_team' in predictions[0]
+
+def test_team_performance_data_concurrent(monkeypatch):
+    import time
+    scraper = TotoScraper(max_workers=8)
+    
+    def slow_team_stats(team_name, rng=None):
+        time.sleep(0.1)
+        return {'ranking': len(team_name)}
+    
+    monkeypatch.setattr(scraper, '_get_team_stats', slow_team_stats)
+    matches = scraper._generate_dummy_matches()
+    
+    start = time.monotonic()
+    team_data = scraper.get_team_performance_data(matches)
+    elapsed = time.monotonic() - start
+    
+    expected_teams = []
+    for match in matches:
+        for team_name in (match['home_team'], match['away_team']):
+            if team_name not in expected_teams:
+                expected_teams.append(team_name)
+    
+    assert list(team_data.keys()) == expected_teams
+    assert all(team_data[name] == {'ranking': len(name)} for name in expected_teams)
+    assert elapsed < 0.1 * len(expected_teams) / 2
+
+def _make_response(url, status_code=200, content=b'', headers=None):
+    import requests
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.url = url
+    response.headers.update(headers or {})
+    return response
+
+def test_http_cache_hit_and_revalidation(tmp_path):
+    from app.batch.http_cache import HttpCache
+    
+    url = 'https://www.toto-dream.com/'
+    cache = HttpCache(str(tmp_path), host_ttls={'www.toto-dream.com': 600})
+    scraper = TotoScraper(cache=cache)
+    calls = []
+    
+    def fake_get(request_url, timeout=None, headers=None):
+        calls.append(headers or {})
+        if headers and headers.get('If-None-Match') == '"v1"':
+            return _make_response(request_url, status_code=304)
+        return _make_response(request_url, content=b'<html>toto</html>', headers={'ETag': '"v1"'})
+    
+    scraper.session.get = fake_get
+    
+    assert scraper._retry_request(url).content == b'<html>toto</html>'
+    assert scraper._retry_request(url).content == b'<html>toto</html>'
+    assert len(calls) == 1
+    
+    cache.host_ttls['www.toto-dream.com'] = 0
+    assert scraper._retry_request(url).content == b'<html>toto</html>'
+    assert len(calls) == 2
+    assert calls[1]['If-None-Match'] == '"v1"'
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'revalidations': 1, 'hit_rate': 2 / 3}
+
+def test_http_cache_lru_eviction(tmp_path):
+    import os
+    import time
+    from app.batch.http_cache import HttpCache
+    
+    cache = HttpCache(str(tmp_path), max_bytes=250)
+    for i in range(3):
+        url = f'https://data.j-league.or.jp/SFMS02/?team_name={i}'
+        cache.store(url, _make_response(url, content=b'x' * 100))
+        time.sleep(0.01)
+    
+    assert cache.lookup('https://data.j-league.or.jp/SFMS02/?team_name=0') is None
+    assert cache.lookup('https://data.j-league.or.jp/SFMS02/?team_name=2') is not None
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.body')]) == 2
+
+def test_job_manager_collapses_same_key():
+    import threading
+    from app.batch.jobs import JobManager
+    
+    manager = JobManager(max_workers=2)
+    release = threading.Event()
+    calls = []
+    
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {'status': 'done'}
+    
+    first = manager.submit('round-1', work)
+    second = manager.submit('round-1', work)
+    assert first is second
+    
+    release.set()
+    assert first.done.wait(5)
+    assert first.to_dict()['status'] == 'succeeded'
+    assert first.to_dict()['result'] == {'status': 'done'}
+    assert len(calls) == 1
+    
+    third = manager.submit('round-1', work)
+    assert third is not first
+    assert third.done.wait(5)
+
+def test_run_batch_returns_job(client, monkeypatch):
+    from app.batch import pipeline
+    
+    monkeypatch.setattr(pipeline, 'run_batch_pipeline', lambda: {'toto_info': {'round': '1'}, 'predictions': []})
+    
+    response = client.post('/api/run-batch')
+    assert response.status_code == 202
+    job_id = response.json['job_id']
+    
+    from app.batch.jobs import get_job_manager
+    assert get_job_manager().get(job_id).done.wait(5)
+    
+    response = client.get(response.json['job_url'])
+    assert response.status_code == 200
+    assert response.json['status'] == 'succeeded'
+    assert response.json['result']['toto_info']['round'] == '1'
+    
+    assert client.get('/api/jobs/unknown').status_code == 404
+
+def test_latest_prediction_from_store(client, tmp_path, monkeypatch):
+    from app.batch import store
+    
+    prediction_store = store.PredictionStore(str(tmp_path / 'predictions.sqlite3'))
+    monkeypatch.setattr(store, '_prediction_store', prediction_store)
+    
+    assert client.get('/api/latest-prediction').status_code == 404
+    
+    prediction_store.save({'toto_info': {'round': '1500'}, 'predictions': [{'match_number': 1, 'prediction': '1'}]})
+    second = prediction_store.save({'toto_info': {'round': '1501'}, 'predictions': []})
+    
+    response = client.get('/api/latest-prediction')
+    assert response.status_code == 200
+    assert response.json['round'] == '1501'
+    assert response.json['version'] == second['version']
+    assert response.headers['ETag'] == f'"{second["etag"]}"'
+    assert 'max-age=60' in response.headers['Cache-Control']
+    
+    response = client.get('/api/latest-prediction', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+    
+    reopened = store.PredictionStore(str(tmp_path / 'predictions.sqlite3'))
+    assert reopened.latest()['round'] == '1501'
+    assert reopened.get_round('1500')['version'] < second['version']
+
+def test_prediction_responses_are_precompressed(client, tmp_path, monkeypatch):
+    import gzip
+    from app.batch import store
+    
+    prediction_store = store.PredictionStore(str(tmp_path / 'predictions.sqlite3'))
+    monkeypatch.setattr(store, '_prediction_store', prediction_store)
+    predictions = [{'match_number': i, 'home_team': f'ホーム{i}', 'away_team': f'アウェイ{i}', 'prediction': '1'}
+                   for i in range(1, 14)]
+    saved = prediction_store.save({'toto_info': {'round': '1600'}, 'predictions': predictions})
+    assert prediction_store.get_round('1600')['variants'] is saved['variants']
+    
+    plain = client.get('/api/latest-prediction', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+    
+    response = client.get('/api/predictions/1600', headers={'Accept-Encoding': 'br;q=0.5, gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.headers['ETag'] != plain.headers['ETag']
+    assert int(response.headers['Content-Length']) < len(plain.data)
+    assert gzip.decompress(response.data) == plain.data
+    
+    response = client.get('/api/predictions/1600', headers={'Accept-Encoding': 'gzip',
+                                                            'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+    assert client.get('/api/predictions/9999').status_code == 404
+
+def test_prediction_responses_prefer_brotli(client, tmp_path, monkeypatch):
+    import brotli
+    from app.batch import encoding, store
+    
+    prediction_store = store.PredictionStore(str(tmp_path / 'predictions.sqlite3'))
+    monkeypatch.setattr(store, '_prediction_store', prediction_store)
+    predictions = [{'match_number': i, 'home_team': f'ホーム{i}', 'away_team': f'アウェイ{i}', 'prediction': '0'}
+                   for i in range(1, 14)]
+    saved = prediction_store.save({'toto_info': {'round': '1700'}, 'predictions': predictions})
+    
+    response = client.get('/api/predictions/1700', headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.headers['ETag'] == f'"{saved["etag"]}-br"'
+    assert brotli.decompress(response.data) == saved['payload'].encode('utf-8')
+    
+    monkeypatch.setattr(encoding, 'brotli', None)
+    assert set(encoding.compress_variants(saved['payload'].encode('utf-8'))) == {'identity', 'gzip'}
+
+def test_rate_limiter_token_buckets():
+    from app.batch.ratelimit import RateLimiter, parse_limit
+    
+    now = [0.0]
+    limiter = RateLimiter(parse_limit('2/60'), parse_limit('3/60'), clock=lambda: now[0])
+    
+    assert limiter.acquire('a')[0] and limiter.acquire('a')[0]
+    allowed, retry_after = limiter.acquire('a')
+    assert not allowed and retry_after == pytest.approx(30)
+    assert limiter.acquire('b')[0]
+    assert limiter.acquire('c') == (False, pytest.approx(20))
+    
+    now[0] = 30.0
+    assert limiter.acquire('a')[0]
+    assert parse_limit('off') is None
+
+def test_run_batch_rate_limit_and_coalescing(client, monkeypatch):
+    import threading
+    from app.batch import pipeline, ratelimit
+    from app.batch.jobs import get_job_manager
+    
+    release = threading.Event()
+    def slow_pipeline():
+        release.wait(5)
+        return {'toto_info': {'round': '1'}, 'predictions': []}
+    
+    monkeypatch.setattr(pipeline, 'run_batch_pipeline', slow_pipeline)
+    monkeypatch.setattr(ratelimit, '_rate_limiter', ratelimit.RateLimiter(ratelimit.parse_limit('1/60'), None))
+    
+    from app.batch.jobs import CURRENT_ROUND_JOB_KEY
+    from app.batch.metrics import JOB_SUBMISSIONS
+    joined_before = JOB_SUBMISSIONS.value(key=CURRENT_ROUND_JOB_KEY, outcome='joined')
+    
+    first = client.post('/api/run-batch')
+    assert first.status_code == 202 and first.json['joined'] is False
+    second = client.post('/api/run-batch')
+    assert second.status_code == 202 and second.json['joined'] is True
+    assert JOB_SUBMISSIONS.value(key=CURRENT_ROUND_JOB_KEY, outcome='joined') == joined_before + 1
+    assert second.json['job_id'] == first.json['job_id']
+    
+    release.set()
+    assert get_job_manager().get(first.json['job_id']).done.wait(5)
+    
+    limited = client.post('/api/run-batch')
+    assert limited.status_code == 429
+    assert int(limited.headers['Retry-After']) >= 1
+    assert 'toto_rate_limit_decisions_total{outcome="limited_client"}' in client.get('/metrics').get_data(as_text=True)
+
+def test_profiled_batch_writes_collapsed_stacks(client, tmp_path, monkeypatch):
+    import time
+    from app.batch import pipeline
+    from app.batch.jobs import get_job_manager
+    
+    def busy_pipeline(all_rounds=False, fresh=False):
+        assert fresh
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+        return {'toto_info': {'round': '1'}, 'predictions': []}
+    
+    monkeypatch.setattr(pipeline, 'run_batch_pipeline', busy_pipeline)
+    monkeypatch.setenv('TOTO_PROFILE_DIR', str(tmp_path))
+    monkeypatch.setenv('TOTO_ADMIN_TOKEN', 'secret')
+    
+    assert client.post('/api/run-batch', headers={'X-Toto-Profile': '1'}).status_code == 403
+    
+    headers = {'X-Toto-Profile': '1', 'X-Toto-Admin-Token': 'secret'}
+    response = client.post('/api/run-batch', headers=headers)
+    assert response.status_code == 202 and response.json['profile'] is True
+    job = get_job_manager().get(response.json['job_id'])
+    assert job.done.wait(5)
+    profile = job.result['profile']
+    assert profile['sample_count'] > 0
+    
+    collapsed = client.get(f'/api/admin/profiles/{profile["collapsed"]}', headers=headers).get_data(as_text=True)
+    assert 'test_app:test_profiled_batch_writes_collapsed_stacks.<locals>.busy_pipeline' in collapsed
+    summary = client.get(f'/api/admin/profiles/{profile["summary"]}', headers=headers).json
+    assert any(f['function'].endswith('busy_pipeline') and f['self_samples'] > 0 for f in summary['functions'])
+    assert client.get('/api/admin/profiles/../predictions.sqlite3', headers=headers).status_code == 404
+
+def test_match_dataset_queries_are_indexed_and_memory_mapped(tmp_path, monkeypatch):
+    import numpy as np
+    from app.batch.match_dataset import build_match_dataset, get_match_dataset
+    from app.batch.models import HistoricalMatch
+    
+    matches = [
+        HistoricalMatch('2024/03/02', 'J1', '浦和レッズ', 'FC東京', 2, 0),
+        HistoricalMatch('2023/11/03', 'J1', 'FC東京', '浦和レッズ', 1, 1),
+        HistoricalMatch('2024/03/09', 'J1', '鹿島アントラーズ', '浦和レッズ', 0, 1),
+        HistoricalMatch('2024/03/16', 'J2', 'ベガルタ仙台', 'モンテディオ山形', 3, 2),
+        HistoricalMatch('2024/03/30', 'J1', '浦和レッズ', 'FC東京', 0, 3),
+    ]
+    monkeypatch.setenv('TOTO_MATCH_DATASET_DIR', str(tmp_path))
+    assert get_match_dataset() is None
+    build_match_dataset(matches, str(tmp_path))
+    dataset = get_match_dataset()
+    
+    assert len(dataset) == 5
+    assert isinstance(dataset.columns['date'].base, np.memmap)
+    assert [m.date for m in dataset.matches('浦和レッズ')] == ['2023/11/03', '2024/03/02', '2024/03/09', '2024/03/30']
+    assert dataset.matches('ベガルタ仙台')[0].league == 'J2'
+    
+    form = dataset.form('浦和レッズ', before='2024/03/30', since='2024/01/01')
+    assert (form.matches, form.points, form.goals_for, form.goals_against) == (2, 6, 3, 0)
+    assert dataset.form('浦和レッズ', last=1).points == 0
+    
+    head_to_head = dataset.head_to_head('浦和レッズ', 'FC東京', before='2024/12/31')
+    assert (head_to_head.wins, head_to_head.draws, head_to_head.losses) == (1, 1, 1)
+    assert dataset.head_to_head('浦和レッズ', '存在しないチーム').matches == 0
+    
+    build_match_dataset(matches[:2], str(tmp_path))
+    assert len(get_match_dataset()) == 2
+
+def test_predictor_uses_match_history_features(tmp_path):
+    from app.batch.match_dataset import MatchDataset, build_match_dataset
+    from app.batch.models import HistoricalMatch
+    
+    history = [HistoricalMatch(f'2024/0{month}/01', 'J1', '浦和レッズ', 'FC東京', 3, 0) for month in range(3, 8)]
+    build_match_dataset(history, str(tmp_path))
+    dataset = MatchDataset.open(str(tmp_path))
+    
+    predictor = TotoPredictor(match_dataset=dataset)
+    assert predictor._history_adjustment('浦和レッズ', 'FC東京', '2024/08/01') > 0
+    assert predictor._history_adjustment('浦和レッズ', 'FC東京', '2024/03/01') == 0
+    assert predictor._params_key() != TotoPredictor()._params_key()
+    
+    toto_info = {'date': '2024/08/01', 'matches': [{'match_number': 1, 'home_team': '浦和レッズ', 'away_team': 'FC東京'}]}
+    assert predictor.predict_matches(toto_info, {})[0]['prediction'] == '1'
+
+def test_vectorized_predictor_matches_scalar(tmp_path, monkeypatch):
+    import random
+    from app.batch import predictor as predictor_module, shared_cache
+    from app.batch.vectorized import VectorizedPredictor, make_param_grid
+    
+    monkeypatch.setattr(shared_cache, '_shared_cache', shared_cache.SharedCache(str(tmp_path / 'shared.sqlite3')))
+    random.seed(42)
+    scraper = TotoScraper()
+    predictor = TotoPredictor(close_match_prediction='0')
+    vectorized = VectorizedPredictor(predictor)
+    
+    rounds = []
+    for _ in range(20):
+        matches = scraper._generate_dummy_matches()
+        random.shuffle(matches)
+        team_data = {}
+        for match in matches:
+            for team_name in (match['home_team'], match['away_team']):
+                team_data[team_name] = scraper._generate_dummy_team_stats()
+        team_data.pop(matches[0]['away_team'])
+        rounds.append(({'matches': matches}, team_data))
+    
+    predictor_module.clear_prediction_cache()
+    for toto_info, team_data in rounds:
+        assert vectorized.predict_matches(toto_info, team_data) == predictor.predict_matches(toto_info, team_data)
+    
+    table, home_idx, away_idx = vectorized.pack_rounds(rounds)
+    grid = make_param_grid(recent_matches_weight=[0.2, 0.4], ranking_weight=[0.3, 0.5], home_away_weight=[0.3])
+    codes = vectorized.predict_codes(table, home_idx, away_idx, grid)
+    
+    assert codes.shape == (4, 20, 13)
+    assert set(codes.ravel().tolist()) <= {0, 1, 2}
+    
+    predictor.ranking_weight = 0.5
+    toto_info, team_data = rounds[3]
+    expected = [int(p['prediction']) for p in predictor.predict_matches(toto_info, team_data)]
+    order = sorted(range(13), key=lambda i: toto_info['matches'][i]['match_number'])
+    assert [int(codes[3, 3, i]) for i in order] == expected
+
+def test_latest_match_dates_reads_team_index(tmp_path, monkeypatch):
+    import sqlite3
+    from app.batch.history import HistoryStore
+    
+    db_path = str(tmp_path / 'history.sqlite3')
+    store = HistoryStore(db_path)
+    store.save_round({'round': '1500', 'date': '2024/05/25',
+                      'matches': [{'match_number': 1, 'home_team': 'A', 'away_team': 'B'}]}, {}, {1: '1'})
+    store.save_round({'round': '1501', 'date': '2024/06/01',
+                      'matches': [{'match_number': 1, 'home_team': 'A', 'away_team': 'C'}]}, {})
+    store.save_round({'round': '1502', 'date': '2024/06/08',
+                      'matches': [{'match_number': 1, 'home_team': 'B', 'away_team': 'C'}]}, {})
+    
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('DROP TABLE team_rounds')
+    store = HistoryStore(db_path)
+    
+    monkeypatch.setattr(HistoryStore, '_unpack', staticmethod(lambda blob: pytest.fail('BLOBを展開しました')))
+    assert store.latest_match_dates(until='2024/06/01') == {'A': '2024/06/01', 'B': '2024/05/25', 'C': '2024/06/01'}
+    assert store.latest_match_dates(until='2024/05/31') == {'A': '2024/05/25', 'B': '2024/05/25'}
+
+def test_backtest_sweep_matches_replay(tmp_path):
+    import random
+    from app.batch import predictor as predictor_module
+    from app.batch.history import HistoryStore
+    from app.batch.backtest import BacktestRunner
+    from app.batch.vectorized import make_param_grid
+    
+    random.seed(7)
+    scraper = TotoScraper()
+    history = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    for round_number in range(12):
+        matches = scraper._generate_dummy_matches()
+        team_data = {team: scraper._generate_dummy_team_stats()
+                     for match in matches for team in (match['home_team'], match['away_team'])}
+        results = {match['match_number']: random.choice(['1', '0', '2']) for match in matches}
+        history.save_round({'round': str(round_number), 'matches': matches}, team_data, results)
+    history.save_round({'round': '99', 'matches': []}, {})
+    
+    runner = BacktestRunner.from_store(history)
+    assert len(runner.rounds) == 12
+    
+    grid = make_param_grid(recent_matches_weight=[0.2, 0.4, 0.6], ranking_weight=[0.3, 0.5])
+    reports = runner.sweep(grid, processes=2, chunk_size=2)
+    assert len(reports) == 6
+    assert reports[0]['accuracy'] >= reports[-1]['accuracy']
+    assert all(report['total'] == 12 * 13 for report in reports)
+    
+    predictor_module.clear_prediction_cache()
+    for report in reports:
+        assert runner.replay(report['params'])['correct'] == report['correct']
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def _read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+def test_strained_lxml_parse_matches_full_tree():
+    from app.batch.scraper import TOP_PAGE_STRAINER, TEAM_PAGE_STRAINER
+    
+    scraper = TotoScraper()
+    top_page = _read_fixture('toto_top.html')
+    team_page = _read_fixture('team_stats.html')
+    
+    scraper.parser = 'html.parser'
+    full_top = scraper._parse_html(top_page)
+    full_team = scraper._parse_team_stats(scraper._parse_html(team_page))
+    
+    scraper.parser = 'lxml'
+    strained_top = scraper._parse_html(top_page, TOP_PAGE_STRAINER)
+    strained_team = scraper._parse_team_stats(scraper._parse_html(team_page, TEAM_PAGE_STRAINER))
+    
+    assert scraper._extract_round_number(strained_top) == scraper._extract_round_number(full_top) == '1500'
+    assert scraper._extract_deadline(strained_top) == '2024/06/08 13:50'
+    assert scraper._extract_matches(strained_top) == scraper._extract_matches(full_top)
+    assert len(scraper._extract_matches(strained_top)) == 13
+    assert strained_team == full_team
+    assert strained_team['ranking'] == 3
+    assert strained_top.find('ul', class_='news-list') is None
+
+def test_seeded_scraper_is_reproducible(monkeypatch):
+    import random
+    
+    def fetch_nothing(url, method='GET', **kwargs):
+        return None
+    
+    results = []
+    for _ in range(2):
+        scraper = TotoScraper(rng=random.Random(1234))
+        monkeypatch.setattr(scraper, '_retry_request', fetch_nothing)
+        results.append(scraper.get_team_performance_data(scraper._generate_dummy_matches()))
+    
+    assert results[0] == results[1]
+
+def test_predict_matches_is_deterministic_and_memoized(monkeypatch):
+    from app.batch import predictor as predictor_module
+    
+    predictor_module.clear_prediction_cache()
+    toto_info = {'matches': [{'match_number': i + 1, 'home_team': f'home{i}', 'away_team': f'away{i}'} for i in range(13)]}
+    team_data = {}
+    
+    first = TotoPredictor().predict_matches(toto_info, team_data)
+    
+    calls = []
+    original = TotoPredictor._predict_matches
+    
+    def counting_predict(self, *args):
+        calls.append(1)
+        return original(self, *args)
+    
+    monkeypatch.setattr(TotoPredictor, '_predict_matches', counting_predict)
+    second = TotoPredictor().predict_matches(toto_info, team_data)
+    assert second == first
+    assert calls == []
+    
+    predictor_module.clear_prediction_cache()
+    third = TotoPredictor().predict_matches(toto_info, team_data)
+    assert third == first
+    assert len(calls) == 1
+    
+    assert predictor_module.compute_input_hash(toto_info, team_data) != predictor_module.compute_input_hash(toto_info, {'x': {}})
+
+def test_seeded_predictor_bypasses_prediction_caches(tmp_path):
+    import random
+    from app.batch import predictor as predictor_module
+    from app.batch.shared_cache import SharedCache
+    
+    predictor_module.clear_prediction_cache()
+    shared_cache = SharedCache(str(tmp_path / 'shared.sqlite3'))
+    toto_info = {'matches': [{'match_number': i + 1, 'home_team': f'home{i}', 'away_team': f'away{i}'} for i in range(13)]}
+    
+    picks = {
+        tuple(p['prediction'] for p in TotoPredictor(rng=random.Random(seed), shared_cache=shared_cache).predict_matches(toto_info, {}))
+        for seed in range(6)
+    }
+    assert len(picks) > 1
+    
+    first = TotoPredictor(rng=random.Random(7)).predict_matches(toto_info, {})
+    assert TotoPredictor(rng=random.Random(7)).predict_matches(toto_info, {}) == first
+    assert not predictor_module._prediction_cache
+
+def test_circuit_breaker_fails_fast_during_outage(monkeypatch):
+    import requests
+    from app.batch import scraper as scraper_module
+    from app.batch.retry import CircuitBreakerRegistry, RetryPolicy, OPEN
+    
+    sleeps = []
+    monkeypatch.setattr(scraper_module.time, 'sleep', sleeps.append)
+    
+    policy = RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=4.0)
+    breakers = CircuitBreakerRegistry(failure_threshold=5, reset_timeout=60)
+    scraper = TotoScraper(max_workers=1, retry_policy=policy, circuit_breakers=breakers)
+    calls = []
+    
+    def failing_get(url, timeout=None, **kwargs):
+        calls.append(url)
+        raise requests.ConnectionError('connection refused')
+    
+    scraper.session.get = failing_get
+    team_data = scraper.get_team_performance_data(scraper._generate_dummy_matches())
+    
+    assert len(team_data) == 20
+    assert len(calls) == 5
+    assert breakers.states() == {'data.j-league.or.jp': OPEN}
+    assert all(0 <= delay <= 4.0 for delay in sleeps)
+    assert scraper.retry_count == 3
+
+def test_circuit_breaker_trial_released_when_deadline_expires_half_open():
+    from app.batch.retry import CircuitBreakerRegistry, RetryPolicy, CLOSED, HALF_OPEN
+    
+    url = 'https://data.j-league.or.jp/'
+    breakers = CircuitBreakerRegistry(failure_threshold=1, reset_timeout=0)
+    breaker = breakers.get('data.j-league.or.jp')
+    breaker.record_failure()
+    
+    expired = TotoScraper(retry_policy=RetryPolicy(deadline=0), circuit_breakers=breakers)
+    expired.session.get = lambda url, timeout=None, **kwargs: _make_response(url)
+    assert expired._request_with_retry(url) is None
+    
+    broken = TotoScraper(circuit_breakers=breakers)
+    def raise_value_error(url, timeout=None, **kwargs):
+        raise ValueError('unexpected')
+    broken.session.get = raise_value_error
+    with pytest.raises(ValueError):
+        broken._request_with_retry(url)
+    assert breaker.state == HALF_OPEN
+    
+    healthy = TotoScraper(circuit_breakers=breakers)
+    healthy.session.get = lambda url, timeout=None, **kwargs: _make_response(url)
+    assert healthy._request_with_retry(url).status_code == 200
+    assert breaker.state == CLOSED
+
+def test_retry_policy_backoff_and_deadline():
+    from app.batch.retry import RetryPolicy
+    
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0, multiplier=2.0, deadline=0)
+    assert all(0 <= policy.backoff(attempt) <= min(5.0, 2 ** attempt) for attempt in range(6) for _ in range(20))
+    assert policy.start().expired()
+    assert not RetryPolicy(deadline=None).start().expired()
+
+def test_metrics_endpoint(client):
+    from app.batch.metrics import REGISTRY, stage_timer
+    
+    histogram = REGISTRY.histogram('toto_test_seconds', 'Test histogram.', ('stage',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage='fetch')
+    histogram.observe(0.5, stage='fetch')
+    with stage_timer('predict'):
+        pass
+    
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    
+    body = response.get_data(as_text=True)
+    assert '# TYPE toto_test_seconds histogram' in body
+    assert 'toto_test_seconds_bucket{stage="fetch",le="0.1"} 1' in body
+    assert 'toto_test_seconds_bucket{stage="fetch",le="1.0"} 2' in body
+    assert 'toto_test_seconds_bucket{stage="fetch",le="+Inf"} 2' in body
+    assert 'toto_test_seconds_count{stage="fetch"} 2' in body
+    assert 'toto_batch_stage_seconds_count{stage="predict"}' in body
+
+def test_scraper_against_fixture_stand_in(monkeypatch):
+    from benchmarks.stand_in import FixtureResponder, mount
+    from app.batch import scraper as scraper_module
+    from app.batch.retry import CircuitBreakerRegistry
+    
+    monkeypatch.setattr(scraper_module.time, 'sleep', lambda seconds: None)
+    responder = FixtureResponder()
+    scraper = TotoScraper(circuit_breakers=CircuitBreakerRegistry())
+    mount(scraper.session, responder)
+    
+    toto_info = scraper.get_latest_toto_info()
+    assert toto_info['round'] == '1500'
+    assert len(toto_info['matches']) == 13
+    
+    team_data = scraper.get_team_performance_data(toto_info['matches'])
+    assert len(team_data) == 26
+    assert all(stats['ranking'] == 3 for stats in team_data.values())
+    assert responder.requests_served == 27
+    
+    failing = FixtureResponder(failure_rate=1.0)
+    scraper = TotoScraper(circuit_breakers=CircuitBreakerRegistry())
+    mount(scraper.session, failing)
+    assert scraper.get_latest_toto_info() is None
+    assert failing.requests_served == scraper.retry_count
+
+def test_incremental_team_stats_refresh(tmp_path):
+    from benchmarks.stand_in import FixtureResponder, mount
+    from app.batch.models import RecentMatch
+    from app.batch.retry import CircuitBreakerRegistry
+    from app.batch.team_state import TeamStateStore, merge_recent_matches
+    
+    team_state = TeamStateStore(str(tmp_path / 'team_state.sqlite3'))
+    responder = FixtureResponder()
+    
+    def make_scraper():
+        scraper = TotoScraper(circuit_breakers=CircuitBreakerRegistry(), team_state=team_state)
+        mount(scraper.session, responder)
+        return scraper
+    
+    matches = make_scraper()._generate_dummy_matches()
+    first = make_scraper().get_team_performance_data(matches)
+    assert responder.requests_served == 20
+    assert team_state.get('浦和レッズ')['last_match_date'] == '2024/05/25'
+    
+    second = make_scraper().get_team_performance_data(matches, {'浦和レッズ': '2024/05/20'})
+    assert responder.requests_served == 20
+    assert second == first
+    
+    third = make_scraper().get_team_performance_data(matches, {'浦和レッズ': '2024/06/01', 'FC東京': '2024/06/01'})
+    assert responder.requests_served == 22
+    assert third['浦和レッズ']['recent_matches'] == first['浦和レッズ']['recent_matches']
+    
+    stored = [RecentMatch('W', date='2024/05/25'), RecentMatch('L', date='2024/05/18')]
+    fetched = [RecentMatch('D', date='2024/06/01'), RecentMatch('W', date='2024/05/25')]
+    merged = merge_recent_matches(stored, fetched, '2024/05/25', limit=2)
+    assert merged == [RecentMatch('D', date='2024/06/01'), RecentMatch('W', date='2024/05/25')]
+
+def test_slotted_models_round_trip(client, monkeypatch):
+    from app.batch import pipeline
+    from app.batch.jobs import get_job_manager
+    from app.batch.models import Match, TeamStats, dumps
+    
+    stats = TeamStats.coerce({
+        'recent_matches': [{'result': 'W', 'goals_for': 2, 'goals_against': 0, 'opponent': 'FC東京', 'date': '2024/05/25'}],
+        'ranking': 3,
+        'home_stats': {'wins': 5, 'draws': 2, 'losses': 1},
+        'away_stats': {'wins': 2, 'draws': 3, 'losses': 3}
+    })
+    assert not hasattr(stats, '__dict__')
+    assert stats['ranking'] == 3 and stats.home_stats.total == 8
+    assert TeamStats.coerce(stats.to_dict()) == stats
+    assert '"opponent":"FC東京"' in dumps(stats)
+    
+    monkeypatch.setattr(pipeline, 'run_batch_pipeline', lambda: {'matches': [Match(1, '浦和レッズ', 'FC東京')]})
+    response = client.post('/api/run-batch')
+    get_job_manager().get(response.json['job_id']).done.wait(5)
+    job = client.get(response.json['job_url']).json
+    assert job['result']['matches'] == [{'match_number': 1, 'home_team': '浦和レッズ', 'away_team': 'FC東京'}]
+
+def test_all_open_rounds_in_one_batch(tmp_path, monkeypatch):
+    from benchmarks.stand_in import FixtureResponder, StandInServer
+    from app.batch import history, http_cache, locks, pipeline, shared_cache, store, team_state
+    from app.batch.predictor import clear_prediction_cache
+    
+    monkeypatch.setattr(http_cache, '_default_cache', http_cache.HttpCache(str(tmp_path / 'http')))
+    monkeypatch.setattr(locks, '_single_flight', locks.SingleFlight(str(tmp_path / 'locks')))
+    monkeypatch.setenv('TOTO_MATCH_DATASET_DIR', str(tmp_path / 'matches'))
+    monkeypatch.setattr(shared_cache, '_shared_cache', shared_cache.SharedCache(str(tmp_path / 'shared.sqlite3')))
+    monkeypatch.setattr(store, '_prediction_store', store.PredictionStore(str(tmp_path / 'predictions.sqlite3')))
+    monkeypatch.setattr(history, '_history_store', history.HistoryStore(str(tmp_path / 'history.sqlite3')))
+    monkeypatch.setattr(team_state, '_team_state_store', team_state.TeamStateStore(str(tmp_path / 'team_state.sqlite3')))
+    clear_prediction_cache()
+    
+    responder = FixtureResponder()
+    with StandInServer(responder) as server:
+        for name, value in server.environ().items():
+            monkeypatch.setenv(name, value)
+        result = pipeline.run_batch_pipeline(all_rounds=True)
+    
+    rounds = result['rounds']
+    assert [(r['toto_info']['product'], r['toto_info']['round']) for r in rounds] == [
+        ('toto', '1500'), ('minitoto', '1500'), ('winner', '300')]
+    assert [len(r['predictions']) for r in rounds] == [13, 5, 1]
+    assert responder.requests_served == 3 + 26
+    
+    assert store.get_prediction_store().latest()['round'] == '1500'
+    assert store.get_prediction_store().get_round('minitoto:1500') is not None
+    assert history.get_history_store().count() == 3
+
+def test_job_events_stream(client, monkeypatch):
+    from app.batch import pipeline
+    from app.batch.jobs import get_job_manager, progress_publisher
+    
+    def fake_pipeline():
+        publish = progress_publisher()
+        publish('toto_info', {'round': '1500', 'matches': []})
+        publish('prediction', {'round': '1500', 'match_number': 1, 'prediction': '1'})
+        return {'toto_info': {'round': '1500'}, 'predictions': []}
+    
+    monkeypatch.setattr(pipeline, 'run_batch_pipeline', fake_pipeline)
+    response = client.post('/api/run-batch')
+    assert get_job_manager().get(response.json['job_id']).done.wait(5)
+    
+    stream = client.get(response.json['events_url'])
+    assert stream.mimetype == 'text/event-stream'
+    body = stream.get_data(as_text=True)
+    assert body.index('event: toto_info') < body.index('event: prediction') < body.index('event: done')
+    assert 'data: {"round":"1500","match_number":1,"prediction":"1"}' in body
+    assert '"status":"succeeded"' in body
+    
+    resumed = client.get(response.json['events_url'], headers={'Last-Event-ID': '2'}).get_data(as_text=True)
+    assert 'event: toto_info' not in resumed and 'id: 3\nevent: done' in resumed
+    
+    assert client.get('/api/jobs/unknown/events').status_code == 404
+
+def test_prewarm_scheduler_tightens_towards_deadline(monkeypatch):
+    from datetime import datetime, timedelta
+    from app.batch import pipeline
+    from app.batch.jobs import JobManager
+    from app.batch.scheduler import JST, PrewarmScheduler, parse_cadence, parse_deadline
+    
+    now = datetime(2024, 6, 1, 12, 0, tzinfo=JST)
+    deadline = parse_deadline('2024/06/08 13:50')
+    assert deadline == datetime(2024, 6, 8, 13, 50, tzinfo=JST)
+    
+    assert parse_cadence('0:600,86400:3600') == ((86400, 3600), (0, 600))
+    scheduler = PrewarmScheduler(job_manager=JobManager(max_workers=1), clock=lambda: now)
+    assert scheduler.next_interval([deadline]) == 21600
+    now = deadline - timedelta(hours=5)
+    assert scheduler.next_interval([deadline]) == 1800
+    now = deadline - timedelta(minutes=4)
+    assert scheduler.next_interval([deadline]) == 240
+    now = deadline + timedelta(minutes=1)
+    assert scheduler.next_interval([deadline]) == scheduler.after_deadline_interval
+    
+    now = deadline - timedelta(hours=30)
+    monkeypatch.setattr(pipeline, 'run_batch_pipeline',
+                        lambda: {'toto_info': {'round': '1500', 'deadline': '2024/06/08 13:50'}, 'predictions': []})
+    assert scheduler.run_once() == 3600
+    assert scheduler.next_run_at == now + timedelta(hours=1)
+    
+    def failing_pipeline():
+        raise pipeline.BatchError('toto情報の取得に失敗しました')
+    monkeypatch.setattr(pipeline, 'run_batch_pipeline', failing_pipeline)
+    assert scheduler.run_once() == scheduler.retry_interval
+
+def _single_flight_worker(lock_dir, db_path, counter_path, queue):
+    import time
+    from app.batch.locks import SingleFlight
+    from app.batch.shared_cache import SharedCache
+    
+    cache = SharedCache(db_path)
+    
+    def compute():
+        with open(counter_path, 'a') as f:
+            f.write('x')
+        time.sleep(0.3)
+        cache.set('batch:test', 'done', 60)
+        return 'done'
+    
+    queue.put(SingleFlight(lock_dir).run('batch:test', lambda: cache.get('batch:test'), compute))
+
+def test_single_flight_across_processes(tmp_path):
+    import multiprocessing
+    
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    counter_path = tmp_path / 'computed'
+    args = (str(tmp_path / 'locks'), str(tmp_path / 'shared.sqlite3'), str(counter_path), queue)
+    workers = [context.Process(target=_single_flight_worker, args=args) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    results = [queue.get(timeout=10) for _ in workers]
+    for worker in workers:
+        worker.join(10)
+    
+    assert results == ['done'] * 4
+    assert counter_path.read_text() == 'x'
+
+def test_lock_timeout_never_runs_unlocked(tmp_path):
+    from app.batch.http_cache import HttpCache
+    from app.batch.locks import LockTimeout, SingleFlight
+    from app.batch.retry import RetryPolicy
+
+    url = 'https://data.j-league.or.jp/'
+    single_flight = SingleFlight(str(tmp_path / 'locks'))
+    holder = single_flight.lock(f'http:{url}')
+    assert holder.acquire()
+    try:
+        entered = []
+        with pytest.raises(LockTimeout):
+            with single_flight.lock(f'http:{url}', timeout=0.1):
+                entered.append(True)
+        assert entered == []
+
+        scraper = TotoScraper(cache=HttpCache(str(tmp_path / 'http')), single_flight=single_flight,
+                              retry_policy=RetryPolicy(deadline=0.1))
+        requested = []
+        scraper.session.get = lambda url, timeout=None, **kwargs: requested.append(url) or _make_response(url)
+        assert scraper._retry_request(url) is None
+        assert requested == []
+    finally:
+        holder.release()
+
+    with single_flight.lock(f'http:{url}', timeout=-1.0) as lock:
+        assert lock.acquired
+
+def test_probabilities_and_ticket_optimizer(client, tmp_path, monkeypatch):
+    import random
+    from itertools import product
+    from app.batch import store
+    from app.batch.models import MatchProbabilities
+    from app.batch.probability import ProbabilisticPredictor, outcome_probabilities
+    from app.batch.tickets import optimize_ticket
+    
+    home_win, draw, away_win = outcome_probabilities(0.0)
+    assert home_win == away_win and abs(home_win + draw + away_win - 1) < 1e-9
+    assert outcome_probabilities(30.0)[0] > 0.9
+    
+    rng = random.Random(0)
+    model = ProbabilisticPredictor(scale=8.0, draw_margin=5.0)
+    rounds = []
+    for round_number in range(60):
+        matches, team_data, results = [], {}, {}
+        for i in range(13):
+            home, away = f'H{round_number}-{i}', f'A{round_number}-{i}'
+            team_data[home] = {'ranking': rng.randint(1, 20)}
+            team_data[away] = {'ranking': rng.randint(1, 20)}
+            matches.append({'match_number': i + 1, 'home_team': home, 'away_team': away})
+            probabilities = outcome_probabilities(model.score_diff(team_data[home], team_data[away]), 8.0, 5.0)
+            results[i + 1] = rng.choices(['1', '0', '2'], weights=probabilities)[0]
+        rounds.append(({'matches': matches}, team_data, results))
+    fitted = ProbabilisticPredictor().calibrate(rounds)
+    assert fitted['matches'] == 780
+    assert abs(fitted['scale'] - 8.0) <= 2.5 and abs(fitted['draw_margin'] - 5.0) <= 2.5
+    
+    probabilities = []
+    for i in range(7):
+        weights = [rng.random() + 0.05 for _ in range(3)]
+        total = sum(weights)
+        probabilities.append(MatchProbabilities(i + 1, f'H{i}', f'A{i}', *(w / total for w in weights)))
+    
+    def brute_force(max_combinations):
+        best = 0.0
+        for counts in product((1, 2, 3), repeat=len(probabilities)):
+            cost = 1
+            for count in counts:
+                cost *= count
+            if cost > max_combinations:
+                continue
+            hit = 1.0
+            for p, count in zip(probabilities, counts):
+                hit *= sum(sorted((p.home_win, p.draw, p.away_win), reverse=True)[:count])
+            best = max(best, hit)
+        return best
+    
+    for max_combinations in (1, 2, 5, 12, 36, 3 ** 7):
+        ticket = optimize_ticket(probabilities, max_combinations)
+        assert ticket['combinations'] <= max_combinations
+        assert abs(ticket['hit_probability'] - brute_force(max_combinations)) < 1e-12
+    assert all(len(mark['marks']) == 3 for mark in optimize_ticket(probabilities, 3 ** 7)['marks'])
+    
+    prediction_store = store.PredictionStore(str(tmp_path / 'predictions.sqlite3'))
+    monkeypatch.setattr(store, '_prediction_store', prediction_store)
+    assert client.get('/api/tickets').status_code == 404
+    prediction_store.save({'toto_info': {'round': '1500'}, 'predictions': [], 'probabilities': probabilities})
+    response = client.get('/api/tickets?max_combinations=12')
+    assert response.status_code == 200
+    assert response.json['round'] == '1500' and response.json['combinations'] <= 12
+    assert len(response.json['marks']) == 7
+    assert client.get('/api/tickets?max_combinations=abc').status_code == 400
+
+def test_calibration_is_reused_until_results_change(tmp_path, monkeypatch):
+    from app.batch.history import HistoryStore
+    from app.batch.probability import ProbabilisticPredictor
+    
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    toto_info = {'round': '1500', 'matches': [{'match_number': 1, 'home_team': 'A', 'away_team': 'B'}]}
+    store.save_round(toto_info, {}, {1: '1'})
+    
+    loads = []
+    original = store.load_rounds
+    monkeypatch.setattr(store, 'load_rounds', lambda: loads.append(1) or original())
+    
+    ProbabilisticPredictor.from_history(store)
+    ProbabilisticPredictor.from_history(store)
+    store.save_round({'round': '1501', 'matches': []}, {})
+    ProbabilisticPredictor.from_history(store)
+    assert len(loads) == 1
+    
+    store.save_results('1501', {1: '0'})
+    ProbabilisticPredictor.from_history(store)
+    assert len(loads) == 2
+
+def test_app_factory_and_warm_up():
+    from app.factory import create_app
+    from app.warmup import warm_up
+    
+    factory_app = create_app({'TESTING': True}, warm_up='off')
+    assert factory_app.test_client().get('/health').json['status'] == 'ok'
+    assert factory_app is not app
+    
+    timings = warm_up()
+    assert set(timings) == {'modules', 'transport', 'parser', 'stores', 'scheduler'}
+    assert 'app.batch.pipeline' in sys.modules and 'numpy' in sys.modules
+    assert warm_up() == timings
+    
+    with pytest.raises(ValueError):
+        create_app(warm_up='lazy')
+
+def test_pooled_transport_reuses_connections():
+    from benchmarks.stand_in import FixtureResponder, StandInServer
+    from app.batch.retry import CircuitBreakerRegistry
+    from app.batch.transport import PooledTransport
+    
+    transport = PooledTransport(pool_maxsize=2)
+    assert 'gzip' in transport.headers['Accept-Encoding']
+    
+    with StandInServer(FixtureResponder()) as server:
+        url = f'{server.base_url}/'
+        for _ in range(3):
+            scraper = TotoScraper(circuit_breakers=CircuitBreakerRegistry(), session=transport.session())
+            response = scraper._retry_request(url)
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert '第1500回' in response.content.decode('utf-8')
+        assert server.connections_opened == 1
+    transport.close()
+    
+    assert TotoScraper().session.get_adapter('https://www.toto-dream.com/') is \
+        TotoScraper().session.get_adapter('https://data.j-league.or.jp/')